@@ -0,0 +1,349 @@
+# Annotated with HEAVY_LEVEL comments, same levels as Storage.py.
+
+# from https://github.com/qinhy/singleton-key-value-storage.git
+import asyncio
+import inspect
+import json
+import uuid
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Literal, Optional
+
+try:
+    from .Storage import (AbstractStorageController, DictStorage, EventDispatcherController,
+                          open_dump_file, dump_page, iter_dump_pages)
+    from .rjson import SimpleRSAChunkEncryptor
+except Exception as e:
+    from Storage import (AbstractStorageController, DictStorage, EventDispatcherController,
+                         open_dump_file, dump_page, iter_dump_pages)
+    from rjson import SimpleRSAChunkEncryptor
+
+class AsyncAbstractStorageController:
+    # HEAVY_LEVEL: Light
+    # Reason: Stores the model reference.
+    # Complexity: O(1).
+    def __init__(self, model): self.model = model
+    # HEAVY_LEVEL: Light
+    # Reason: Placeholder method that only prints a message.
+    # Complexity: O(1).
+    async def exists(self, key: str)->bool: print(f'[{self.__class__.__name__}]: not implement')
+    # HEAVY_LEVEL: Light
+    # Reason: Placeholder method that only prints a message.
+    # Complexity: O(1).
+    async def set(self, key: str, value: dict): print(f'[{self.__class__.__name__}]: not implement')
+    # HEAVY_LEVEL: Light
+    # Reason: Placeholder method that only prints a message.
+    # Complexity: O(1).
+    async def get(self, key: str)->dict: print(f'[{self.__class__.__name__}]: not implement')
+    # HEAVY_LEVEL: Light
+    # Reason: Placeholder method that only prints a message.
+    # Complexity: O(1).
+    async def delete(self, key: str): print(f'[{self.__class__.__name__}]: not implement')
+    # HEAVY_LEVEL: Light
+    # Reason: Placeholder method that only prints a message.
+    # Complexity: O(1).
+    async def keys(self, pattern: str='*')->list[str]: print(f'[{self.__class__.__name__}]: not implement')
+    # HEAVY_LEVEL: Medium
+    # Reason: Default runs get() for every key concurrently; backends with a batch read API override it.
+    # Complexity: O(n * backend get cost), overlapped on the event loop.
+    async def mget(self, keys: List[str])->List[dict]: return list(await asyncio.gather(*[self.get(k) for k in keys]))
+    # HEAVY_LEVEL: Medium
+    # Reason: Default runs set() for every item concurrently; backends with a batch write API override it.
+    # Complexity: O(n * backend set cost), overlapped on the event loop.
+    async def mset(self, items: Dict[str, dict]): await asyncio.gather(*[self.set(k,v) for k,v in items.items()])
+    # HEAVY_LEVEL: Medium
+    # Reason: Default runs delete() for every key concurrently; backends with a batch delete API override it.
+    # Complexity: O(n * backend delete cost), overlapped on the event loop.
+    async def mdelete(self, keys: List[str]): await asyncio.gather(*[self.delete(k) for k in keys])
+    # HEAVY_LEVEL: Medium
+    # Reason: Lists all keys and deletes them through mdelete().
+    # Complexity: O(k), k = number of keys.
+    async def clean(self): await self.mdelete(await self.keys('*'))
+    # HEAVY_LEVEL: Heavy
+    # Reason: Reads every key/value via mget() and serializes the full store to JSON.
+    # Complexity: O(total stored data size).
+    async def dumps(self):
+        keys = await self.keys('*')
+        return json.dumps(dict(zip(keys, await self.mget(keys))))
+    # HEAVY_LEVEL: Heavy
+    # Reason: Parses a JSON string and writes every item via mset().
+    # Complexity: O(JSON size + backend batch set cost).
+    async def loads(self, json_string=r'{}'): await self.mset(json.loads(json_string))
+    DUMP_PAGE_SIZE = AbstractStorageController.DUMP_PAGE_SIZE
+    # HEAVY_LEVEL: Heavy
+    # Reason: Streams the store to disk page by page, file writes run off the event loop.
+    # Complexity: O(total stored data size + file I/O); memory O(k + page size).
+    async def dump(self, path: str, page_size: int=None, format: Literal['json','jsonl']='json', compress: bool=None):
+        page_size = page_size or self.DUMP_PAGE_SIZE
+        keys = list(await self.keys('*'))
+        f = await asyncio.to_thread(open_dump_file, path, 'w', compress)
+        try:
+            if format != 'jsonl': await asyncio.to_thread(f.write, '{')
+            for i in range(0, len(keys), page_size):
+                page = keys[i:i + page_size]
+                text = dump_page(list(zip(page, await self.mget(page))), format)
+                await asyncio.to_thread(f.write, (', ' if i and format != 'jsonl' else '') + text)
+            if format != 'jsonl': await asyncio.to_thread(f.write, '}')
+        finally:
+            await asyncio.to_thread(f.close)
+    # HEAVY_LEVEL: Heavy
+    # Reason: Parses the file page by page off the event loop and writes each page via mset().
+    # Complexity: O(file size + backend batch set cost); memory O(page size + largest value).
+    async def load(self, path: str, page_size: int=None):
+        pages = iter_dump_pages(path, page_size or self.DUMP_PAGE_SIZE)
+        while (page := await asyncio.to_thread(next, pages, None)) is not None:
+            await self.mset(page)
+
+class AsyncExecutorStorageController(AsyncAbstractStorageController):
+    """Adapts a synchronous controller by running its calls in an executor."""
+
+    # HEAVY_LEVEL: Light
+    # Reason: Stores the wrapped controller and executor.
+    # Complexity: O(1).
+    def __init__(self, controller: AbstractStorageController,
+                 executor: Optional[Executor] = None, run_inline: bool = False):
+        self.model = controller
+        self.executor = executor
+        # in-memory controllers never block, so skip the thread hop for them
+        self.run_inline = run_inline
+
+    # HEAVY_LEVEL: Light wrapper
+    # Reason: Schedules one synchronous call on the executor; the call itself may be heavy.
+    # Complexity: O(called function cost) plus one thread hand-off.
+    async def _run(self, func: Callable, *args):
+        if self.run_inline: return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    # HEAVY_LEVEL: Light
+    # Reason: Delegates one existence check.
+    # Complexity: Backend-dependent.
+    async def exists(self, key: str)->bool: return await self._run(self.model.exists, key)
+    # HEAVY_LEVEL: Light
+    # Reason: Delegates one write.
+    # Complexity: Backend-dependent.
+    async def set(self, key: str, value: dict): return await self._run(self.model.set, key, value)
+    # HEAVY_LEVEL: Light
+    # Reason: Delegates one read.
+    # Complexity: Backend-dependent.
+    async def get(self, key: str)->dict: return await self._run(self.model.get, key)
+    # HEAVY_LEVEL: Light
+    # Reason: Delegates one delete.
+    # Complexity: Backend-dependent.
+    async def delete(self, key: str): return await self._run(self.model.delete, key)
+    # HEAVY_LEVEL: Medium
+    # Reason: Delegates a key scan.
+    # Complexity: Backend-dependent, commonly O(k).
+    async def keys(self, pattern: str='*')->list[str]: return list(await self._run(self.model.keys, pattern))
+    # HEAVY_LEVEL: Medium
+    # Reason: Delegates one batch read in a single executor hop.
+    # Complexity: Backend batch cost.
+    async def mget(self, keys: List[str])->List[dict]: return await self._run(self.model.mget, keys)
+    # HEAVY_LEVEL: Medium
+    # Reason: Delegates one batch write in a single executor hop.
+    # Complexity: Backend batch cost.
+    async def mset(self, items: Dict[str, dict]): return await self._run(self.model.mset, items)
+    # HEAVY_LEVEL: Medium
+    # Reason: Delegates one batch delete in a single executor hop.
+    # Complexity: Backend batch cost.
+    async def mdelete(self, keys: List[str]): return await self._run(self.model.mdelete, keys)
+    # HEAVY_LEVEL: Medium
+    # Reason: Delegates a full clean.
+    # Complexity: Backend-dependent, O(k).
+    async def clean(self): return await self._run(self.model.clean)
+    # HEAVY_LEVEL: Heavy
+    # Reason: Delegates a full load, which may use a backend-specific file format.
+    # Complexity: O(file size + backend write cost).
+    async def load(self, path: str, page_size: int=None): return await self._run(self.model.load, path, page_size)
+    # HEAVY_LEVEL: Heavy
+    # Reason: Delegates a full dump, which may use a backend-specific file format.
+    # Complexity: O(total stored data size + file I/O).
+    async def dump(self, path: str, page_size: int=None, format: Literal['json','jsonl']='json', compress: bool=None):
+        return await self._run(self.model.dump, path, page_size, format, compress)
+
+class AsyncSingletonKeyValueStorage(AsyncAbstractStorageController):
+    """Asyncio counterpart of SingletonKeyValueStorage (backends, encryption, events, slaves)."""
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Initializes the dispatcher and switches to the default in-memory backend.
+    # Complexity: O(1).
+    def __init__(self, encryptor:SimpleRSAChunkEncryptor=None)->None:
+        self.encryptor = encryptor
+        self.conn:AsyncAbstractStorageController = None
+        self.switch_backend(AsyncExecutorStorageController(DictStorage.build(), run_inline=True))
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Rebuilds the event dispatcher and swaps the backend reference.
+    # Complexity: O(1).
+    def switch_backend(self, controller:AsyncAbstractStorageController):
+        if isinstance(controller, AbstractStorageController):
+            controller = AsyncExecutorStorageController(controller)
+        self._event_dispa = EventDispatcherController(DictStorage())
+        self.conn = controller
+        return self
+
+    # HEAVY_LEVEL: Light
+    # Reason: Prints one formatted message.
+    # Complexity: O(len(msg)).
+    def _print(self,msg): print(f'[{self.__class__.__name__}]: {msg}')
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Delegates to delete_event(), which scans event keys.
+    # Complexity: O(k + matched events).
+    def delete_slave(self, slave:object)->bool: self.delete_event(getattr(slave,'uuid',None))
+
+    # HEAVY_LEVEL: Medium
+    # Reason: May assign a UUID and register callbacks (sync or async) for each requested event name.
+    # Complexity: O(number of event_names).
+    def add_slave(self, slave:object, event_names=['set','delete'])->bool:
+        if getattr(slave,'uuid',None) is None:
+            try:
+                setattr(slave,'uuid',uuid.uuid4())
+            except Exception:
+                return self._print(f'can not set uuid to {slave}. Skip this slave.')
+        for m in event_names:
+            if hasattr(slave, m):
+                self.set_event(m,getattr(slave,m),getattr(slave,'uuid'))
+            else:
+                self._print(f'no func of "{m}" in {slave}. Skip it.')
+
+    # HEAVY_LEVEL: Heavy when encrypting or dispatching many callbacks
+    # Reason: May RSA-encrypt JSON, mutates the backend, and awaits event callbacks.
+    # Complexity: O(value size + backend edit cost + callback cost).
+    async def _edit(self,func_name:str, *args):
+        if func_name not in ['set','delete','clean','load','loads','mset','mdelete']:
+            return self._print(f'no func of "{func_name}". return.')
+        event_args = args
+        if self.encryptor and func_name=='set':
+            key, value = args
+            args = (key, {'rjson':self.encryptor.encrypt_string(json.dumps(value))})
+        if self.encryptor and func_name=='mset':
+            args = ({k:{'rjson':self.encryptor.encrypt_string(json.dumps(v))} for k,v in args[0].items()},)
+        res = await getattr(self.conn, func_name)(*args)
+        # batch edits fan out as per-key events so slaves only need set/delete
+        if func_name=='mset':
+            for k,v in event_args[0].items(): await self.dispatch_event('set',k,v)
+        elif func_name=='mdelete':
+            for k in event_args[0]: await self.dispatch_event('delete',k)
+        else:
+            await self.dispatch_event(func_name,*event_args)
+        return res
+
+    # HEAVY_LEVEL: Light wrapper
+    # Reason: Awaits one edit and converts errors to False.
+    # Complexity: O(edit cost).
+    async def _try_edit_error(self,*args):
+        try:
+            await self._edit(*args)
+            return True
+        except Exception as e:
+            self._print(e)
+            return False
+
+    # True False(in error)
+    # HEAVY_LEVEL: Medium
+    # Reason: Wraps _try_edit_error(); may encrypt and dispatch callbacks.
+    # Complexity: Depends on value size and listeners.
+    async def set(self, key: str, value: dict):     return await self._try_edit_error('set',key,value)
+    # HEAVY_LEVEL: Medium
+    # Reason: Wraps _try_edit_error() for one delete.
+    # Complexity: O(backend delete cost + callback cost).
+    async def delete(self, key: str):               return await self._try_edit_error('delete',key)
+    # HEAVY_LEVEL: Medium
+    # Reason: Wraps _try_edit_error() for one batch write.
+    # Complexity: O(backend batch cost + callback cost).
+    async def mset(self, items: Dict[str, dict]):   return await self._try_edit_error('mset',items)
+    # HEAVY_LEVEL: Medium
+    # Reason: Wraps _try_edit_error() for one batch delete.
+    # Complexity: O(backend batch cost + callback cost).
+    async def mdelete(self, keys: List[str]):       return await self._try_edit_error('mdelete',keys)
+    # HEAVY_LEVEL: Heavy
+    # Reason: Deletes all backend data.
+    # Complexity: O(total stored keys).
+    async def clean(self):                          return await self._try_edit_error('clean')
+    # HEAVY_LEVEL: Heavy
+    # Reason: Reads a file and loads many entries.
+    # Complexity: O(file size + backend write cost).
+    async def load(self,json_path):                 return await self._try_edit_error('load', json_path)
+    # HEAVY_LEVEL: Heavy
+    # Reason: Parses a JSON string and loads many entries.
+    # Complexity: O(JSON size + backend write cost).
+    async def loads(self,json_str):                 return await self._try_edit_error('loads',json_str)
+
+    # HEAVY_LEVEL: Light wrapper
+    # Reason: Awaits one read and converts errors to None.
+    # Complexity: O(awaited call cost).
+    async def _try_load_error(self,aw):
+        try:
+            return await aw
+        except Exception as e:
+            self._print(e)
+            return None
+
+    # HEAVY_LEVEL: Heavy when decrypting; otherwise Light
+    # Reason: May decrypt/JSON-parse an encrypted payload.
+    # Complexity: O(value size + decryption cost) when encrypted.
+    def _decrypt(self, value):
+        if value and self.encryptor and 'rjson' in value:
+            try:
+                value = json.loads(self.encryptor.decrypt_string(value['rjson']))
+            except Exception as e:
+                self._print(e)
+                return None
+        return value
+
+    # Object, None(in error)
+    # HEAVY_LEVEL: Light
+    # Reason: Delegates one existence check to backend.
+    # Complexity: Backend-dependent; typically O(1).
+    async def exists(self, key: str)->bool:         return await self._try_load_error(self.conn.exists(key))
+    # HEAVY_LEVEL: Medium
+    # Reason: Delegates to backend keys(), which commonly scans all keys.
+    # Complexity: O(k), k = number of keys.
+    async def keys(self, regx: str='*')->list[str]: return await self._try_load_error(self.conn.keys(regx))
+    # HEAVY_LEVEL: Heavy when decrypting; otherwise Light
+    # Reason: Reads one value and may decrypt it.
+    # Complexity: O(value size + decryption cost) when encrypted.
+    async def get(self, key: str)->dict:            return self._decrypt(await self._try_load_error(self.conn.get(key)))
+    # HEAVY_LEVEL: Medium
+    # Reason: Reads many values in one backend batch and may decrypt each.
+    # Complexity: O(backend batch cost + decryption cost).
+    async def mget(self, keys: List[str])->List[dict]:
+        values = await self._try_load_error(self.conn.mget(keys))
+        return None if values is None else [self._decrypt(v) for v in values]
+    # HEAVY_LEVEL: Heavy
+    # Reason: Reads all keys and values, decrypts if needed, and serializes to JSON.
+    # Complexity: O(total stored data size + possible decryption cost).
+    async def dumps(self)->str:                     return await self._try_load_error(super().dumps())
+    # HEAVY_LEVEL: Heavy
+    # Reason: Delegates full-store dump to backend, including serialization and file I/O.
+    # Complexity: O(total stored data size + file I/O).
+    async def dump(self,json_path,**kwargs)->None:  return await self._try_load_error(self.conn.dump(json_path,**kwargs))
+
+    # events
+    # HEAVY_LEVEL: Medium
+    # Reason: Lists stored event callbacks through dispatcher.
+    # Complexity: O(k + e).
+    def events(self): return self._event_dispa.events()
+    # HEAVY_LEVEL: Medium
+    # Reason: Finds event keys and returns matching callbacks.
+    # Complexity: O(k + e).
+    def get_event(self, uuid: str): return self._event_dispa.get_event(uuid)
+    # HEAVY_LEVEL: Medium
+    # Reason: Finds and deletes matching event callback entries.
+    # Complexity: O(k + e).
+    def delete_event(self, uuid: str): return self._event_dispa.delete_event(uuid)
+    # HEAVY_LEVEL: Light
+    # Reason: Stores one event callback (plain function or coroutine function).
+    # Complexity: Average O(1).
+    def set_event(self, event_name: str, callback, id:str=None): return self._event_dispa.set_event(event_name, callback, id)
+    # HEAVY_LEVEL: Heavy
+    # Reason: Calls every registered callback and awaits the ones that return awaitables.
+    # Complexity: O(listener scan + callback cost).
+    async def dispatch_event(self, event_name, *args, **kwargs):
+        dispa = self._event_dispa
+        for k in list(dispa.keys(dispa._event_glob(event_name, '*'))):
+            res = (dispa.get(k) or (lambda *a, **kw: None))(*args, **kwargs)
+            if inspect.isawaitable(res): await res
+    # HEAVY_LEVEL: Heavy
+    # Reason: Deletes all event entries through dispatcher clean().
+    # Complexity: O(number of event keys).
+    def clean_events(self): return self._event_dispa.clean()
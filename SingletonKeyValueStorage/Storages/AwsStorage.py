@@ -1,13 +1,15 @@
 # from https://github.com/qinhy/singleton-key-value-storage.git
 import re
+import time
 import uuid
 import fnmatch
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 try:
-    from .Storage import SingletonKeyValueStorage,AbstractStorageController
+    from .Storage import SingletonKeyValueStorage,AbstractStorageController,glob_literal_prefix
 except Exception as e:
-    from Storage import SingletonKeyValueStorage,AbstractStorageController
+    from Storage import SingletonKeyValueStorage,AbstractStorageController,glob_literal_prefix
 
 def try_if_error(func):
     try:
@@ -45,6 +47,11 @@ if aws_dynamo:
             return SingletonDynamoDBStorageController(SingletonDynamoDBStorage(your_table_name))
 
     class SingletonDynamoDBStorageController(AbstractStorageController):
+        BATCH_GET_SIZE = 100  # BatchGetItem limit per request
+        SCAN_SEGMENTS = 4
+        MAX_BACKOFF = 2.0
+        MAX_RETRIES = 10  # rounds of UnprocessedKeys per batch before mget gives up
+
         def __init__(self, model:SingletonDynamoDBStorage):
             self.model:SingletonDynamoDBStorage = model
         
@@ -78,30 +85,85 @@ if aws_dynamo:
             except ClientError as e:
                 print(f'Error deleting value: {e}')
 
-        def keys(self, pattern: str='*')->list[str]:
+        def mset(self, items: dict[str, dict]):
+            try:
+                # batch_writer buffers into 25-item BatchWriteItem calls and resends unprocessed items
+                with self.model.table.batch_writer(overwrite_by_pkeys=['key']) as batch:
+                    for key, value in items.items():
+                        batch.put_item(Item={'key': key, 'value': json.dumps(value)})
+            except ClientError as e:
+                print(f'Error setting values: {e}')
+
+        def mdelete(self, keys: list[str]):
+            try:
+                with self.model.table.batch_writer(overwrite_by_pkeys=['key']) as batch:
+                    for key in keys:
+                        batch.delete_item(Key={'key': key})
+            except ClientError as e:
+                print(f'Error deleting values: {e}')
+
+        def mget(self, keys: list[str])->list[dict]:
+            found = {}
+            table_name = self.model.table.name
+            uniq = list(dict.fromkeys(keys))
+            try:
+                for i in range(0, len(uniq), self.BATCH_GET_SIZE):
+                    request = {table_name: {
+                        'Keys': [{'key': k} for k in uniq[i:i + self.BATCH_GET_SIZE]],
+                        'ProjectionExpression': '#k, #v',
+                        'ExpressionAttributeNames': {'#k': 'key', '#v': 'value'}}}
+                    retries = 0
+                    while request:
+                        response = self.model.client.batch_get_item(RequestItems=request)
+                        for item in response.get('Responses', {}).get(table_name, []):
+                            found[item['key']] = json.loads(item['value'])
+                        request = response.get('UnprocessedKeys') or None
+                        if request:
+                            # throttled, back off before retrying the leftovers
+                            if retries >= self.MAX_RETRIES:
+                                left = len(request[table_name]['Keys'])
+                                raise RuntimeError(f'batch_get_item left {left} keys unprocessed after {retries} retries')
+                            time.sleep(min(self.MAX_BACKOFF, 0.05 * (2 ** retries)))
+                            retries += 1
+            except ClientError as e:
+                print(f'Error getting values: {e}')
+            return [found.get(k) for k in keys]
+
+        def _scan_segment(self, segment: int, total_segments: int, prefix: str)->list[str]:
+            # the resource's client is thread-safe (unlike Table) and still (de)serializes types
+            client = self.model.table.meta.client
+            scan_kwargs = {
+                'TableName': self.model.table.name,
+                'ProjectionExpression': '#k',
+                'ExpressionAttributeNames': {'#k': 'key'},
+                'Segment': segment,
+                'TotalSegments': total_segments,
+            }
+            if prefix:
+                scan_kwargs['FilterExpression'] = 'begins_with(#k, :prefix)'
+                scan_kwargs['ExpressionAttributeValues'] = {':prefix': prefix}
+            keys = []
+            while True:
+                response = client.scan(**scan_kwargs)
+                keys.extend(item['key'] for item in response.get('Items', []))
+                start_key = response.get('LastEvaluatedKey', None)
+                if start_key is None: return keys
+                scan_kwargs['ExclusiveStartKey'] = start_key
+
+        def keys(self, pattern: str='*', total_segments: int=None)->list[str]:
             # Convert simple wildcard patterns to regular expressions for filtering
-            regex = fnmatch.translate(pattern)
-            compiled_regex = re.compile(regex)
+            compiled_regex = re.compile(fnmatch.translate(pattern))
+            total_segments = total_segments or self.SCAN_SEGMENTS
+            prefix = glob_literal_prefix(pattern)
 
             matched_keys = []
             try:
-                # Scan operation with no filters - potentially very costly
-                scan_kwargs = {
-                    'ProjectionExpression': "key",
-                    'FilterExpression': "attribute_exists(key)"
-                }
-                done = False
-                start_key = None
-
-                while not done:
-                    if start_key:
-                        scan_kwargs['ExclusiveStartKey'] = start_key
-                    response = self.model.table.scan(**scan_kwargs)
-                    items = response.get('Items', [])
-                    matched_keys.extend([item['key'] for item in items if compiled_regex.match(item['key'])])
-
-                    start_key = response.get('LastEvaluatedKey', None)
-                    done = start_key is None
+                # Parallel segmented scan, the literal prefix is filtered server side
+                with ThreadPoolExecutor(max_workers=total_segments) as pool:
+                    segments = pool.map(lambda seg: self._scan_segment(seg, total_segments, prefix),
+                                        range(total_segments))
+                    for keys in segments:
+                        matched_keys.extend(k for k in keys if compiled_regex.match(k))
             except ClientError as e:
                 print(f'Error scanning keys: {e}')
 
@@ -110,10 +172,12 @@ if aws_dynamo:
 if aws_s3:
     import boto3
     from mypy_boto3_s3 import S3Client
+    from botocore.config import Config
     from botocore.exceptions import ClientError
     class SingletonS3Storage:
         _instance = None
         _meta = {}
+        MAX_WORKERS = 32
         
         def __new__(cls,bucket_name,
                     aws_access_key_id,aws_secret_access_key,region_name,
@@ -127,17 +191,21 @@ if aws_s3:
             def init():                
                 cls._instance = super(SingletonS3Storage, cls).__new__(cls)
                 cls._instance.uuid = uuid.uuid4()
+                # one thread-safe client shared by the transfer pool, sized to match it
                 cls._instance.s3 = boto3.client('s3',
                     aws_access_key_id=aws_access_key_id,
                     aws_secret_access_key=aws_secret_access_key,
-                    region_name=region_name
+                    region_name=region_name,
+                    config=Config(max_pool_connections=cls.MAX_WORKERS)
                 )
+                cls._instance.pool = ThreadPoolExecutor(max_workers=cls.MAX_WORKERS)
                 cls._instance.bucket_name = bucket_name
-                cls._instance._meta = meta
+                cls._meta = meta
             if cls._instance is None:
                 init()
             elif cls._meta!=meta:                
                 print(f'warnning: instance changed to new one')
+                cls._instance.pool.shutdown(wait=False)  # queued transfers still finish, the threads then exit
                 init()
 
             return cls._instance
@@ -147,8 +215,9 @@ if aws_s3:
                     s3_storage_prefix_path = '/SingletonS3Storage'):
             self.uuid = self.uuid
             self.s3:S3Client = self.s3
+            self.pool:ThreadPoolExecutor = self.pool
             self.bucket_name = self.bucket_name
-            self.s3_storage_prefix_path = '/SingletonS3Storage'
+            self.s3_storage_prefix_path = s3_storage_prefix_path
             
         @staticmethod
         def build(bucket_name,
@@ -159,6 +228,8 @@ if aws_s3:
                     s3_storage_prefix_path))
 
     class SingletonS3StorageController(AbstractStorageController):
+        DELETE_BATCH_SIZE = 1000  # delete_objects limit per request
+
         def __init__(self, model:SingletonS3Storage):
             self.model:SingletonS3Storage = model
             self.bucket_name = self.model.bucket_name
@@ -167,16 +238,17 @@ if aws_s3:
             return f'{self.model.s3_storage_prefix_path}/{key}.json'
             
         def _de_s3_path(self,path:str):
-            return path.replace(f'{self.model.s3_storage_prefix_path}/',''
-                         ).replace(f'.json','')
+            return path[len(f'{self.model.s3_storage_prefix_path}/'):-len('.json')]
         
         def exists(self, key: str)->bool:
             try:
                 self.model.s3.head_object(Bucket=self.bucket_name,
                                           Key=self._s3_path(key))
                 return True
-            except self.model.s3.exceptions.NoSuchKey:
-                return False
+            except ClientError as e:
+                if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                    return False
+                raise
             
         def set(self, key: str, value: dict):
             json_data = json.dumps(value)
@@ -184,18 +256,41 @@ if aws_s3:
                                         Key=self._s3_path(key), Body=json_data)
         
         def get(self, key: str)->dict:
-            obj = self.model.s3.get_object(Bucket=self.bucket_name, Key=self._s3_path(key))
+            try:
+                obj = self.model.s3.get_object(Bucket=self.bucket_name, Key=self._s3_path(key))
+            except self.model.s3.exceptions.NoSuchKey:
+                return None
             return json.loads(obj['Body'].read().decode('utf-8'))
                 
         def delete(self, key):
             self.model.s3.delete_object(Bucket=self.bucket_name, Key=self._s3_path(key))
+
+        def mget(self, keys: list[str])->list[dict]:
+            return list(self.model.pool.map(self.get, keys))
+
+        def mset(self, items: dict[str, dict]):
+            list(self.model.pool.map(lambda kv: self.set(*kv), items.items()))
+
+        def mdelete(self, keys: list[str]):
+            def delete_batch(batch):
+                res = self.model.s3.delete_objects(Bucket=self.bucket_name, Delete={
+                    'Objects': [{'Key': self._s3_path(k)} for k in batch], 'Quiet': True})
+                if res.get('Errors'):
+                    raise Exception(f"Delete failed: {res['Errors']}")
+            keys = list(keys)
+            batches = [keys[i:i + self.DELETE_BATCH_SIZE] for i in range(0, len(keys), self.DELETE_BATCH_SIZE)]
+            list(self.model.pool.map(delete_batch, batches))
+
+        def clean(self): self.mdelete(self.keys('*'))
             
         def keys(self, pattern='*')->list[str]:
             keys = []
             paginator = self.model.s3.get_paginator('list_objects_v2')
-            for page in paginator.paginate(Bucket=self.bucket_name,
-                                           Prefix=self.model.s3_storage_prefix_path):
+            # only list objects under the literal part of the glob
+            prefix = f'{self.model.s3_storage_prefix_path}/{glob_literal_prefix(pattern)}'
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
                 for obj in page.get('Contents', []):
-                    keys.append(self._de_s3_path(obj['Key']))
+                    if obj['Key'].endswith('.json'):
+                        keys.append(self._de_s3_path(obj['Key']))
                     
-            return fnmatch.filter(keys, pattern)
\ No newline at end of file
+            return fnmatch.filter(keys, pattern)
@@ -1,18 +1,21 @@
 # from https://github.com/qinhy/singleton-key-value-storage.git
 
-import re
+import fnmatch
+import json
 import uuid
 from urllib.parse import ParseResult, urlparse
 import requests
+from requests.adapters import HTTPAdapter
 
 try:
-    from .Storage import SingletonKeyValueStorage, AbstractStorageController
+    from .Storage import SingletonKeyValueStorage, AbstractStorageController, glob_literal_prefix
 except Exception as e:
-    from Storage import SingletonKeyValueStorage, AbstractStorageController
+    from Storage import SingletonKeyValueStorage, AbstractStorageController, glob_literal_prefix
 
 class SingletonCouchDBStorage:
     _instance = None
     _meta = {}
+    POOL_MAXSIZE = 16
 
     def __new__(cls, couchdb_URL=None, username=None, password=None, dbname="singleton_db"):
         if cls._instance is not None and cls._meta.get('couchdb_URL', None) == couchdb_URL:
@@ -35,9 +38,19 @@ class SingletonCouchDBStorage:
         cls._instance.password = password
         cls._instance.dbname = dbname
 
+        # One pooled keep-alive session for every request of this instance
+        session = requests.Session()
+        session.auth = (username, password)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=cls.POOL_MAXSIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        cls._instance.session = session
+        # key -> last known _rev, saves a GET before every update/delete
+        cls._instance.revs = {}
+
         # Determine scheme and host        
         couchdb_url = f'http://{url.hostname}:{url.port}/'
-        response = requests.get(couchdb_url)
+        response = session.get(couchdb_url)
         if response.status_code == 200:
             # print("CouchDB is accessible using HTTP.")                
             couchdb_url = f'http://{url.hostname}:{url.port}/'
@@ -48,9 +61,9 @@ class SingletonCouchDBStorage:
         cls._instance.base_url = couchdb_url.rstrip('/')
 
         # Create DB if not exist
-        resp = requests.get(f"{cls._instance.base_url}/{dbname}", auth=(username, password))
+        resp = session.get(f"{cls._instance.base_url}/{dbname}")
         if resp.status_code == 404:
-            resp = requests.put(f"{cls._instance.base_url}/{dbname}", auth=(username, password))
+            resp = session.put(f"{cls._instance.base_url}/{dbname}")
             if not resp.ok:
                 raise Exception(f"Could not create database: {resp.text}")
         cls._meta['couchdb_URL'] = couchdb_URL
@@ -64,11 +77,13 @@ class SingletonCouchDBStorage:
         self.password:str = self.password
         self.dbname:str = self.dbname
         self.base_url:str = self.base_url
+        self.session:requests.Session = self.session
+        self.revs:dict[str,str] = self.revs
 
     # CouchDB REST helpers
     def _request(self, method, path, **kwargs):
         url = f"{self.base_url}/{self.dbname}{path}"
-        resp = requests.request(method, url, auth=(self.username, self.password), **kwargs)
+        resp = self.session.request(method, url, **kwargs)
         return resp
 
     def find(self, selector: dict, limit=1000, skip=0, fields=None, sort=None):
@@ -85,6 +100,26 @@ class SingletonCouchDBStorage:
         if not resp.ok:
             raise Exception(f"Mango query failed: {resp.text}")
         return resp.json().get("docs", [])
+
+    def all_docs(self, keys: list[str] = None, include_docs=False, **params):
+        # GET for range scans, POST when an explicit key list is given
+        params = {k: json.dumps(v) if k in ('startkey', 'endkey', 'key') else v
+                  for k, v in params.items()}
+        if include_docs:
+            params['include_docs'] = 'true'
+        if keys is None:
+            resp = self._request("GET", "/_all_docs", params=params)
+        else:
+            resp = self._request("POST", "/_all_docs", params=params, json={"keys": keys})
+        if not resp.ok:
+            raise Exception(f"_all_docs failed: {resp.text}")
+        return resp.json().get("rows", [])
+
+    def bulk_docs(self, docs: list[dict]) -> list[dict]:
+        resp = self._request("POST", "/_bulk_docs", json={"docs": docs})
+        if not resp.ok:
+            raise Exception(f"_bulk_docs failed: {resp.text}")
+        return resp.json()
     
     @staticmethod
     def build(couchdb_URL=None, username=None, password=None, dbname="singleton_db"):
@@ -93,21 +128,50 @@ class SingletonCouchDBStorage:
 class SingletonCouchDBStorageController(AbstractStorageController):
     def __init__(self, model: SingletonCouchDBStorage):
         self.model: SingletonCouchDBStorage = model
+        self.revs = self.model.revs
+
+    def _fetch_rev(self, key):
+        # HEAD returns the current revision in the ETag header
+        resp = self.model._request("HEAD", f"/{key}")
+        if resp.status_code != 200:
+            self.revs.pop(key, None)
+            return None
+        self.revs[key] = rev = resp.headers.get('ETag', '').strip('"')
+        return rev
+
+    def _fetch_revs(self, keys):
+        revs = {}
+        for row in self.model.all_docs(keys=list(keys)):
+            value = row.get('value') or {}
+            if 'error' in row or value.get('deleted'):
+                self.revs.pop(row.get('key'), None)
+                continue
+            self.revs[row['id']] = revs[row['id']] = value['rev']
+        return revs
         
     def set(self, key, value: dict):
         value = dict(value)
         value['_id'] = key
-        existing = self.get_full(key)
-        if existing and '_rev' in existing:
-            value['_rev'] = existing['_rev']
+        if key in self.revs:
+            value['_rev'] = self.revs[key]
         resp = self.model._request("PUT", f"/{key}", json=value)
+        if resp.status_code == 409:
+            # unknown or stale revision, refresh it and retry once
+            rev = self._fetch_rev(key)
+            if rev: value['_rev'] = rev
+            else: value.pop('_rev', None)  # deleted meanwhile, create it afresh
+            resp = self.model._request("PUT", f"/{key}", json=value)
         if not resp.ok:
             raise Exception(f"Set failed: {resp.text}")
+        self.revs[key] = resp.json()['rev']
 
     def get_full(self, key):
         resp = self.model._request("GET", f"/{key}")
         if resp.status_code == 200:
-            return resp.json()
+            doc = resp.json()
+            self.revs[key] = doc['_rev']
+            return doc
+        self.revs.pop(key, None)
         return None
 
     def get(self, key):
@@ -119,18 +183,94 @@ class SingletonCouchDBStorageController(AbstractStorageController):
         return None
 
     def delete(self, key):
-        doc = self.get_full(key)
-        if not doc or '_rev' not in doc:
+        rev = self.revs.get(key) or self._fetch_rev(key)
+        if not rev:
             return False
-        resp = self.model._request("DELETE", f"/{key}?rev={doc['_rev']}")
+        resp = self.model._request("DELETE", f"/{key}", params={'rev': rev})
+        if resp.status_code == 409:
+            rev = self._fetch_rev(key)
+            if not rev:
+                return False
+            resp = self.model._request("DELETE", f"/{key}", params={'rev': rev})
+        self.revs.pop(key, None)
         return resp.ok
 
     def exists(self, key):
-        resp = self.model._request("HEAD", f"/{key}")
-        return resp.status_code == 200
+        return self._fetch_rev(key) is not None
+
+    def _bulk_write(self, docs: dict[str, dict]):
+        results = self.model.bulk_docs(list(docs.values()))
+        conflicts = []
+        for res in results:
+            if 'rev' in res and 'error' not in res:
+                if docs[res['id']].get('_deleted'):
+                    self.revs.pop(res['id'], None)
+                else:
+                    self.revs[res['id']] = res['rev']
+            elif res.get('error') == 'conflict':
+                conflicts.append(res['id'])
+            else:
+                raise Exception(f"Bulk write failed: {res}")
+        return conflicts
+
+    def mset(self, items: dict[str, dict]):
+        docs = {}
+        for key, value in items.items():
+            doc = dict(value)
+            doc['_id'] = key
+            if key in self.revs: doc['_rev'] = self.revs[key]
+            docs[key] = doc
+        if not docs: return
+        conflicts = self._bulk_write(docs)
+        if conflicts:
+            revs = self._fetch_revs(conflicts)
+            retry = {}
+            for key in conflicts:
+                doc = docs[key]
+                doc.pop('_rev', None)
+                if key in revs: doc['_rev'] = revs[key]
+                retry[key] = doc
+            conflicts = self._bulk_write(retry)
+            if conflicts:
+                raise Exception(f"Set failed on conflicts: {conflicts}")
+
+    def mget(self, keys: list[str]) -> list[dict]:
+        if not keys: return []
+        res = []
+        for row in self.model.all_docs(keys=list(keys), include_docs=True):
+            doc = row.get('doc')
+            if not doc:
+                self.revs.pop(row.get('key'), None)
+                res.append(None)
+                continue
+            self.revs[doc['_id']] = doc.pop('_rev')
+            doc.pop('_id', None)
+            res.append(doc)
+        return res
+
+    def mdelete(self, keys: list[str]):
+        keys = list(keys)
+        revs = {k: self.revs[k] for k in keys if k in self.revs}
+        unknown = [k for k in keys if k not in revs]
+        if unknown: revs.update(self._fetch_revs(unknown))
+        docs = {k: {'_id': k, '_rev': r, '_deleted': True} for k, r in revs.items()}
+        if not docs: return
+        conflicts = self._bulk_write(docs)
+        if conflicts:
+            revs = self._fetch_revs(conflicts)  # keys deleted meanwhile have no rev and are done
+            conflicts = self._bulk_write({k: {'_id': k, '_rev': r, '_deleted': True} for k, r in revs.items()})
+            if conflicts:
+                raise Exception(f"Delete failed on conflicts: {conflicts}")
 
-    def keys(self, pattern: str = '*', limit=1000) -> list[str]:
-        regex = '^' + re.escape(pattern).replace(r'\*', '.*') + '$'
-        selector = {"_id": {"$regex": regex}}
-        docs = self.model.find(selector, fields=["_id"], limit=limit)
-        return [doc['_id'] for doc in docs]
+    def keys(self, pattern: str = '*', page_size=1000) -> list[str]:
+        # range-scan _all_docs by the literal prefix, then match the rest of the glob
+        prefix = glob_literal_prefix(pattern)
+        params = dict(startkey=prefix, endkey=prefix + '\ufff0', limit=page_size)
+        keys = []
+        while True:
+            rows = self.model.all_docs(**params)
+            keys += [row['id'] for row in rows if not row['id'].startswith('_design/')]
+            if len(rows) < page_size:
+                break
+            params.update(startkey=rows[-1]['key'], skip=1)
+        return fnmatch.filter(keys, pattern)
@@ -8,8 +8,10 @@ from pathlib import Path
 
 try:
     from .Storage import SingletonKeyValueStorage,AbstractStorageController
+    from .AsyncStorage import AsyncExecutorStorageController
 except Exception as e:
     from Storage import SingletonKeyValueStorage,AbstractStorageController
+    from AsyncStorage import AsyncExecutorStorageController
 
 
 def try_if_error(func):
@@ -55,6 +57,10 @@ class SingletonFileSystemStorage:
     def build(storage_dir=None, ext='.json'):
         return SingletonFileSystemStorageController(SingletonFileSystemStorage(storage_dir, ext))
 
+    @staticmethod
+    def build_async(storage_dir=None, ext='.json'):
+        return AsyncExecutorStorageController(SingletonFileSystemStorage.build(storage_dir, ext))
+
 class SingletonFileSystemStorageController(AbstractStorageController):
     def __init__(self, model: SingletonFileSystemStorage):
         self.model:SingletonFileSystemStorage = model
@@ -3,9 +3,9 @@ import uuid
 import fnmatch
 
 try:
-    from .Storage import SingletonKeyValueStorage,AbstractStorageController
+    from .Storage import SingletonKeyValueStorage,AbstractStorageController,glob_literal_prefix
 except Exception as e:
-    from Storage import SingletonKeyValueStorage,AbstractStorageController
+    from Storage import SingletonKeyValueStorage,AbstractStorageController,glob_literal_prefix
 
 
 def try_if_error(func):
@@ -58,6 +58,9 @@ if firestore_back:
             return SingletonFirestoreStorageController(SingletonFirestoreStorage(google_project_id,google_firestore_collection))
 
     class SingletonFirestoreStorageController(AbstractStorageController):
+        BATCH_SIZE = 500  # WriteBatch limit per commit
+        ID_FIELD = '__name__'
+
         def __init__(self, model: SingletonFirestoreStorage):
             self.model:SingletonFirestoreStorage = model
 
@@ -75,7 +78,33 @@ if firestore_back:
         def delete(self, key: str):
             self.model.collection.document(key).delete()
 
+        def _batch_write(self, keys: list[str], write):
+            for i in range(0, len(keys), self.BATCH_SIZE):
+                batch = self.model.model.batch()
+                for key in keys[i:i + self.BATCH_SIZE]:
+                    write(batch, self.model.collection.document(key))
+                batch.commit()
+
+        def mset(self, items: dict[str, dict]):
+            self._batch_write(list(items), lambda batch, ref: batch.set(ref, items[ref.id]))
+
+        def mdelete(self, keys: list[str]):
+            self._batch_write(list(keys), lambda batch, ref: batch.delete(ref))
+
+        def mget(self, keys: list[str])->list[dict]:
+            refs = [self.model.collection.document(k) for k in dict.fromkeys(keys)]
+            # get_all streams snapshots back in arbitrary order
+            found = {doc.id: doc.to_dict() for doc in self.model.model.get_all(refs) if doc.exists}
+            return [found.get(k) for k in keys]
+
         def keys(self, pattern: str='*')->list[str]:
-            docs = self.model.collection.stream()
-            keys = [doc.id for doc in docs]
-            return fnmatch.filter(keys, pattern)      
+            # project to the document name only, and range-scan ids by the glob's literal prefix
+            query = self.model.collection.select([self.ID_FIELD])
+            prefix = glob_literal_prefix(pattern)
+            if prefix:
+                query = query.where(filter=firestore.FieldFilter(
+                    self.ID_FIELD, '>=', self.model.collection.document(prefix)))
+                query = query.where(filter=firestore.FieldFilter(
+                    self.ID_FIELD, '<', self.model.collection.document(prefix + '\uf8ff')))
+            keys = [doc.id for doc in query.stream()]
+            return fnmatch.filter(keys, pattern)
@@ -3,8 +3,10 @@ import uuid
 
 try:
     from .Storage import SingletonKeyValueStorage,AbstractStorageController
+    from .AsyncStorage import AsyncAbstractStorageController
 except Exception as e:
     from Storage import SingletonKeyValueStorage,AbstractStorageController
+    from AsyncStorage import AsyncAbstractStorageController
     
 def try_if_error(func):
     try:
@@ -17,7 +19,7 @@ def try_if_error(func):
 mongo_back     = try_if_error(lambda:__import__('pymongo')) is None
 
 if mongo_back:
-    from pymongo import MongoClient, database, collection
+    from pymongo import MongoClient, UpdateOne, database, collection
     
     class SingletonMongoDBStorage:
         _instance = None
@@ -38,6 +40,7 @@ if mongo_back:
                 client = MongoClient(mongo_URL)
                 cls._instance.db = client.get_database(db_name)
                 cls._instance.collection = cls._instance.db.get_collection(collection_name)
+                cls._instance._acollection = None  # built on first async use, sync-only users never pay for it
                 cls._instance._meta = dict(mongo_URL=mongo_URL,db_name=db_name,collection_name=collection_name)
             return cls._instance
 
@@ -47,10 +50,24 @@ if mongo_back:
             self.db:database.Database = self.db
             self.collection:collection.Collection = self.collection
 
+        @property
+        def acollection(self):
+            if self._acollection is None:
+                # native asyncio client (pymongo's successor to motor), connects lazily
+                from pymongo import AsyncMongoClient
+                m = self._meta
+                self._acollection = AsyncMongoClient(m['mongo_URL']).get_database(m['db_name']).get_collection(m['collection_name'])
+            return self._acollection
+
         @staticmethod
         def build(mongo_URL: str = "mongodb://127.0.0.1:27017/", 
                         db_name: str = "SingletonDB", collection_name: str = "store"):
             return SingletonMongoDBStorageController(SingletonMongoDBStorage(mongo_URL, db_name, collection_name))
+
+        @staticmethod
+        def build_async(mongo_URL: str = "mongodb://127.0.0.1:27017/", 
+                        db_name: str = "SingletonDB", collection_name: str = "store"):
+            return AsyncSingletonMongoDBStorageController(SingletonMongoDBStorage(mongo_URL, db_name, collection_name))
         
     class SingletonMongoDBStorageController(AbstractStorageController):
         
@@ -76,3 +93,42 @@ if mongo_back:
         def keys(self, pattern: str = '*')->list[str]:
             regex = '^'+pattern.replace('*', '.*')
             return [doc['_id'] for doc in self.model.collection.find({self._ID_KEY(): {"$regex": regex}})]
+
+    class AsyncSingletonMongoDBStorageController(AsyncAbstractStorageController):
+
+        def __init__(self, model: SingletonMongoDBStorage):
+            self.model: SingletonMongoDBStorage = model
+
+        def _ID_KEY(self):return '_id'
+
+        async def exists(self, key: str)->bool:
+            return await self.model.acollection.find_one({self._ID_KEY(): key}) is not None
+
+        async def set(self, key: str, value: dict):
+            await self.model.acollection.update_one({self._ID_KEY(): key}, {"$set": value}, upsert=True)
+
+        async def get(self, key: str)->dict:
+            res = await self.model.acollection.find_one({self._ID_KEY(): key})
+            if res: del res['_id']
+            return res
+
+        async def delete(self, key: str):
+            await self.model.acollection.delete_one({self._ID_KEY(): key})
+
+        async def keys(self, pattern: str = '*')->list[str]:
+            regex = '^'+pattern.replace('*', '.*')
+            return [doc['_id'] async for doc in self.model.acollection.find({self._ID_KEY(): {"$regex": regex}}, {'_id': 1})]
+
+        async def mget(self, keys: list[str])->list[dict]:
+            found = {}
+            async for doc in self.model.acollection.find({self._ID_KEY(): {"$in": list(keys)}}):
+                found[doc.pop('_id')] = doc
+            return [found.get(k) for k in keys]
+
+        async def mset(self, items: dict[str, dict]):
+            if not items: return
+            await self.model.acollection.bulk_write(
+                [UpdateOne({self._ID_KEY(): k}, {"$set": v}, upsert=True) for k, v in items.items()], ordered=False)
+
+        async def mdelete(self, keys: list[str]):
+            await self.model.acollection.delete_many({self._ID_KEY(): {"$in": list(keys)}})
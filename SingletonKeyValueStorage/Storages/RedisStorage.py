@@ -8,8 +8,10 @@ from urllib.parse import urlparse
 
 try:
     from .Storage import SingletonKeyValueStorage,AbstractStorageController
+    from .AsyncStorage import AsyncAbstractStorageController
 except Exception as e:
     from Storage import SingletonKeyValueStorage,AbstractStorageController
+    from AsyncStorage import AsyncAbstractStorageController
 
 
 def try_if_error(func):
@@ -42,6 +44,8 @@ if redis_back:
             cls._instance = super(SingletonRedisStorage, cls).__new__(cls)                        
             cls._instance.uuid = uuid.uuid4()
             cls._instance.client = redis.Redis(host=url.hostname, port=url.port, db=0, decode_responses=True)
+            cls._instance._url = url
+            cls._instance._aclient = None  # built on first async use, sync-only users never pay for it
             cls._meta['redis_URL'] = redis_URL
 
             return cls._instance
@@ -49,11 +53,22 @@ if redis_back:
         def __init__(self, redis_URL=None):#redis://127.0.0.1:6379
             self.uuid:str = self.uuid
             self.client:redis.Redis = self.client
+
+        @property
+        def aclient(self) -> 'redis.asyncio.Redis':
+            if self._aclient is None:
+                import redis.asyncio
+                self._aclient = redis.asyncio.Redis(host=self._url.hostname, port=self._url.port, db=0, decode_responses=True)
+            return self._aclient
         
         @staticmethod
         def build(redis_URL=None):
             return SingletonRedisStorageController(SingletonRedisStorage(redis_URL))
 
+        @staticmethod
+        def build_async(redis_URL=None):
+            return AsyncSingletonRedisStorageController(SingletonRedisStorage(redis_URL))
+
     class SingletonRedisStorageController(AbstractStorageController):
         def __init__(self, model: SingletonRedisStorage):
             self.model:SingletonRedisStorage = model
@@ -78,3 +93,37 @@ if redis_back:
             except Exception as e:
                 res = []
             return res
+
+    class AsyncSingletonRedisStorageController(AsyncAbstractStorageController):
+        def __init__(self, model: SingletonRedisStorage):
+            self.model:SingletonRedisStorage = model
+
+        async def exists(self, key: str)->bool:
+            return bool(await self.model.aclient.exists(key))
+
+        async def set(self, key: str, value: dict):
+            await self.model.aclient.set(key, json.dumps(value))
+
+        async def get(self, key: str)->dict:
+            res = await self.model.aclient.get(key)
+            if res: res = json.loads(res)
+            return res
+
+        async def delete(self, key: str):
+            await self.model.aclient.delete(key)
+
+        async def keys(self, pattern: str='*')->list[str]:
+            # SCAN does not block the server the way KEYS does
+            return [k async for k in self.model.aclient.scan_iter(match=pattern, count=1000)]
+
+        async def mget(self, keys: list[str])->list[dict]:
+            if not keys: return []
+            return [json.loads(v) if v else None for v in await self.model.aclient.mget(keys)]
+
+        async def mset(self, items: dict[str, dict]):
+            if not items: return
+            await self.model.aclient.mset({k: json.dumps(v) for k, v in items.items()})
+
+        async def mdelete(self, keys: list[str]):
+            if not keys: return
+            await self.model.aclient.delete(*keys)
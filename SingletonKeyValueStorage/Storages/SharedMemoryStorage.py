@@ -0,0 +1,333 @@
+# from https://github.com/qinhy/singleton-key-value-storage.git
+import os
+import json
+import mmap
+import uuid
+import zlib
+import struct
+import fnmatch
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .Storage import SingletonKeyValueStorage,AbstractStorageController
+    from .AsyncStorage import AsyncExecutorStorageController
+except Exception as e:
+    from Storage import SingletonKeyValueStorage,AbstractStorageController
+    from AsyncStorage import AsyncExecutorStorageController
+
+
+def try_if_error(func):
+    try:
+        func()
+    except Exception as e:
+        print(e)
+        return e
+
+# self checking
+shm_back       = try_if_error(lambda:__import__('fcntl')) is None
+
+if shm_back:
+    import fcntl
+
+    # File layout, shared by every process that maps it:
+    #   [0, 128)            header: magic, slot count, arena size, tail, live count, garbage bytes, tombstones;
+    #                       seqlock generation at GEN_OFF (odd while a writer is inside)
+    #   [128, ARENA)        hash index, n_slots x (crc32(key) + 1, record offset); 0 = empty, offset TOMB = deleted
+    #   [ARENA, file end)   append-only records (key_len u32, value_len u32, key, JSON value), compacted when full
+    MAGIC = b'SKVSHM01'
+    HEADER = struct.Struct('<8sQQ')
+    U64 = struct.Struct('<Q')
+    SLOT = struct.Struct('<QQ')
+    REC = struct.Struct('<II')
+    TAIL_OFF, COUNT_OFF, GARBAGE_OFF, TOMBS_OFF, GEN_OFF = 24, 32, 40, 48, 64
+    SLOTS = 128
+    TOMB = 1
+    MAX_LOAD = 0.75
+    _u64_at, _slot_at, _rec_at = U64.unpack_from, SLOT.unpack_from, REC.unpack_from
+    _decode = json.JSONDecoder().decode  # values are always UTF-8 JSON, skip json.loads' encoding sniffing
+
+    class SingletonSharedMemoryStorage:
+        _instance = None
+        _meta = {}
+
+        DEFAULT_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+        def __new__(cls, path: str = None, size_mb: float = 64.0, max_keys: int = 100000):
+            path = str(Path(path or os.path.join(cls.DEFAULT_DIR, 'singleton_kv_storage')).resolve())
+            if cls._instance is not None and cls._meta.get('path') == path:
+                return cls._instance
+
+            if cls._instance is not None and cls._meta.get('path') != path:
+                print(f'warning: storage instance changed to {path}')
+
+            inst = super(SingletonSharedMemoryStorage, cls).__new__(cls)
+            inst.uuid = uuid.uuid4()
+            inst.path = path
+            inst._open(size_mb, max_keys)
+            os.register_at_fork(after_in_child=inst._after_fork)
+            cls._instance = inst
+            cls._meta['path'] = path
+            return cls._instance
+
+        def __init__(self, path: str = None, size_mb: float = 64.0, max_keys: int = 100000):
+            self.uuid: str = self.uuid
+            self.path: str = self.path
+
+        def _open(self, size_mb: float, max_keys: int):
+            # the first process sizes the file; later ones adopt its layout and ignore size_mb/max_keys
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self.fd).st_size == 0:
+                    n_slots = 1 << max(4, int(max_keys / MAX_LOAD) - 1).bit_length()
+                    arena = SLOTS + n_slots * SLOT.size
+                    os.ftruncate(self.fd, arena + int(size_mb * 1024 * 1024))
+                    self.mm = mmap.mmap(self.fd, 0)
+                    HEADER.pack_into(self.mm, 0, MAGIC, n_slots, arena)
+                    U64.pack_into(self.mm, TAIL_OFF, arena)
+                else:
+                    self.mm = mmap.mmap(self.fd, 0)
+                    if self.mm[:8] != MAGIC: raise ValueError(f'{self.path} is not a shared memory storage file')
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            _, self.n_slots, self.arena = HEADER.unpack_from(self.mm, 0)
+            self.end = len(self.mm)
+            self.view = memoryview(self.mm)
+            self.lock = threading.Lock()  # flock does not exclude threads sharing one fd
+            self.closed = False
+
+        def _after_fork(self):
+            # a forked child shares the parent's open file description, and with it the flock;
+            # reopen so the two processes lock against each other. The MAP_SHARED mapping stays valid.
+            if self.closed: return
+            self.fd = os.open(self.path, os.O_RDWR)
+            self.lock = threading.Lock()
+
+        def close(self):
+            self.closed = True
+            self.view.release()
+            self.mm.close()
+            os.close(self.fd)
+            if SingletonSharedMemoryStorage._instance is self:
+                SingletonSharedMemoryStorage._instance = None
+                SingletonSharedMemoryStorage._meta.clear()
+
+        def unlink(self):
+            self.close()
+            os.unlink(self.path)
+
+        @staticmethod
+        def build(path: str = None, size_mb: float = 64.0, max_keys: int = 100000):
+            return SingletonSharedMemoryStorageController(SingletonSharedMemoryStorage(path, size_mb, max_keys))
+
+        @staticmethod
+        def build_async(path: str = None, size_mb: float = 64.0, max_keys: int = 100000):
+            return AsyncExecutorStorageController(SingletonSharedMemoryStorage.build(path, size_mb, max_keys))
+
+    class SingletonSharedMemoryStorageController(AbstractStorageController):
+        READ_RETRIES = 3  # optimistic reads before falling back to the shared lock
+
+        def __init__(self, model: SingletonSharedMemoryStorage):
+            self.model: SingletonSharedMemoryStorage = model
+
+        # Locking -------------------------------------------------------------- #
+        @contextmanager
+        def _write(self):
+            m = self.model
+            with m.lock:
+                fcntl.flock(m.fd, fcntl.LOCK_EX)
+                try:
+                    # a writer that died inside leaves the generation odd; step past it either way
+                    gen = (U64.unpack_from(m.mm, GEN_OFF)[0] | 1) + 2
+                    U64.pack_into(m.mm, GEN_OFF, gen)
+                    try:
+                        yield m.mm
+                    finally:
+                        U64.pack_into(m.mm, GEN_OFF, gen + 1)
+                finally:
+                    fcntl.flock(m.fd, fcntl.LOCK_UN)
+
+        def _read(self, func: Callable[[mmap.mmap], Any]) -> Any:
+            # seqlock: run func without locking and keep the result only if no writer ran meanwhile
+            mm = self.model.mm
+            for _ in range(self.READ_RETRIES):
+                gen = U64.unpack_from(mm, GEN_OFF)[0]
+                if gen & 1: continue
+                try:
+                    res = func(mm)
+                except Exception:
+                    continue  # read a half-written index or record
+                if U64.unpack_from(mm, GEN_OFF)[0] == gen: return res
+            m = self.model
+            with m.lock:
+                fcntl.flock(m.fd, fcntl.LOCK_SH)
+                try:
+                    return func(mm)
+                finally:
+                    fcntl.flock(m.fd, fcntl.LOCK_UN)
+
+        # Index ---------------------------------------------------------------- #
+        def _find(self, mm: mmap.mmap, kb: bytes, h: int):
+            # -> (slot to use, record offset or 0); slot is None when the index is full
+            n = self.model.n_slots
+            mask, free = n - 1, None
+            i = h & mask
+            for _ in range(n):
+                sh, off = _slot_at(mm, SLOTS + (i << 4))
+                if sh == 0: return (i if free is None else free), 0
+                if off == TOMB:
+                    if free is None: free = i
+                elif sh == h:
+                    kl, _ = _rec_at(mm, off)
+                    if mm[off + 8:off + 8 + kl] == kb: return i, off
+                i = (i + 1) & mask
+            return free, 0
+
+        def _value_span(self, mm: mmap.mmap, kb: bytes, h: int) -> Optional[slice]:
+            _, off = self._find(mm, kb, h)
+            if not off: return None
+            kl, vl = _rec_at(mm, off)
+            return slice(off + 8 + kl, off + 8 + kl + vl)
+
+        def _value(self, mm: mmap.mmap, kb: bytes, h: int) -> Optional[bytes]:
+            s = self._value_span(mm, kb, h)
+            return None if s is None else mm[s]
+
+        def _get_bytes(self, key: str) -> Optional[bytes]:
+            kb, h = self._hashed(key)
+            mm = self.model.mm
+            gen = _u64_at(mm, GEN_OFF)[0]
+            if not gen & 1:  # one optimistic try inline; _read retries and falls back to the lock
+                try:
+                    raw = self._value(mm, kb, h)
+                    if _u64_at(mm, GEN_OFF)[0] == gen: return raw
+                except Exception:
+                    pass
+            return self._read(lambda mm: self._value(mm, kb, h))
+
+        def _hashed(self, key: str):
+            kb = key.encode()
+            return kb, zlib.crc32(kb) + 1
+
+        def _compact(self, mm: mmap.mmap):
+            m = self.model
+            live = []
+            for sh, off in SLOT.iter_unpack(m.view[SLOTS:m.arena]):
+                if sh and off != TOMB:
+                    kl, vl = REC.unpack_from(mm, off)
+                    live.append((sh, mm[off:off + REC.size + kl + vl]))
+            slots, arena, mask = bytearray(m.n_slots * SLOT.size), bytearray(), m.n_slots - 1
+            for sh, rec in live:
+                i = sh & mask
+                while SLOT.unpack_from(slots, i * SLOT.size)[0]: i = (i + 1) & mask
+                SLOT.pack_into(slots, i * SLOT.size, sh, m.arena + len(arena))
+                arena += rec
+            mm[SLOTS:m.arena] = slots
+            mm[m.arena:m.arena + len(arena)] = arena
+            for off, v in ((TAIL_OFF, m.arena + len(arena)), (GARBAGE_OFF, 0), (TOMBS_OFF, 0)):
+                U64.pack_into(mm, off, v)
+
+        def _set(self, mm: mmap.mmap, key: str, value: dict):
+            m = self.model
+            kb, vb = key.encode(), json.dumps(value).encode()
+            h, need = zlib.crc32(kb) + 1, REC.size + len(kb) + len(vb)
+            tail, count, garbage, tombs = (U64.unpack_from(mm, o)[0] for o in (TAIL_OFF, COUNT_OFF, GARBAGE_OFF, TOMBS_OFF))
+            if (tail + need > m.end and garbage) or (tombs and count + tombs >= m.n_slots * MAX_LOAD):
+                self._compact(mm)
+                tail, tombs = U64.unpack_from(mm, TAIL_OFF)[0], 0
+            if tail + need > m.end:
+                raise MemoryError(f'shared memory arena full ({m.end - m.arena} bytes), rebuild with a larger size_mb')
+            i, off = self._find(mm, kb, h)
+            if not off and count >= m.n_slots * MAX_LOAD:
+                raise MemoryError(f'shared memory index full ({count} keys), rebuild with a larger max_keys')
+            # write the record first and flip the slot last, so a reader sees the old or the new value
+            REC.pack_into(mm, tail, len(kb), len(vb))
+            mm[tail + REC.size:tail + need] = kb + vb
+            U64.pack_into(mm, TAIL_OFF, tail + need)
+            if off:
+                kl, vl = REC.unpack_from(mm, off)
+                U64.pack_into(mm, GARBAGE_OFF, U64.unpack_from(mm, GARBAGE_OFF)[0] + REC.size + kl + vl)
+            else:
+                if SLOT.unpack_from(mm, SLOTS + i * SLOT.size)[1] == TOMB: U64.pack_into(mm, TOMBS_OFF, tombs - 1)
+                U64.pack_into(mm, COUNT_OFF, count + 1)
+            SLOT.pack_into(mm, SLOTS + i * SLOT.size, h, tail)
+
+        def _delete(self, mm: mmap.mmap, key: str) -> bool:
+            kb, h = self._hashed(key)
+            i, off = self._find(mm, kb, h)
+            if not off: return False
+            kl, vl = REC.unpack_from(mm, off)
+            SLOT.pack_into(mm, SLOTS + i * SLOT.size, h, TOMB)
+            for o, d in ((COUNT_OFF, -1), (TOMBS_OFF, 1), (GARBAGE_OFF, REC.size + kl + vl)):
+                U64.pack_into(mm, o, U64.unpack_from(mm, o)[0] + d)
+            return True
+
+        # Storage API ---------------------------------------------------------- #
+        def exists(self, key: str) -> bool:
+            return self._get_bytes(key) is not None
+
+        def set(self, key: str, value: dict):
+            with self._write() as mm: self._set(mm, key, value)
+
+        def get(self, key: str) -> dict:
+            raw = self._get_bytes(key)
+            return None if raw is None else _decode(raw.decode())
+
+        def get_raw(self, key: str) -> Optional[memoryview]:
+            # zero-copy view of the JSON bytes; valid until the next compaction or clean(),
+            # and it must be released before the storage is closed
+            kb, h = self._hashed(key)
+            s = self._read(lambda mm: self._value_span(mm, kb, h))
+            return None if s is None else self.model.view[s]
+
+        def delete(self, key: str):
+            with self._write() as mm:
+                if not self._delete(mm, key): raise KeyError(key)
+
+        def keys(self, pattern: str = '*') -> List[str]:
+            def scan(mm):
+                res = []
+                for sh, off in SLOT.iter_unpack(self.model.view[SLOTS:self.model.arena]):
+                    if sh and off != TOMB:
+                        kl, _ = REC.unpack_from(mm, off)
+                        res.append(mm[off + REC.size:off + REC.size + kl].decode())
+                return res
+            keys = self._read(scan)
+            return keys if pattern == '*' else fnmatch.filter(keys, pattern)
+
+        def mget(self, keys: List[str]) -> List[dict]:
+            hashed = [self._hashed(k) for k in keys]
+            def read(mm):
+                return [self._value(mm, kb, h) for kb, h in hashed]
+            return [None if raw is None else _decode(raw.decode()) for raw in self._read(read)]
+
+        def mset(self, items: Dict[str, dict]):
+            with self._write() as mm:
+                for k, v in items.items(): self._set(mm, k, v)
+
+        def mdelete(self, keys: List[str]):
+            with self._write() as mm:
+                for k in keys: self._delete(mm, k)
+
+        def clean(self):
+            with self._write() as mm:
+                mm[SLOTS:self.model.arena] = bytes(self.model.arena - SLOTS)
+                for off, v in ((TAIL_OFF, self.model.arena), (COUNT_OFF, 0), (GARBAGE_OFF, 0), (TOMBS_OFF, 0)):
+                    U64.pack_into(mm, off, v)
+
+        def compact(self):
+            with self._write() as mm: self._compact(mm)
+
+        def stats(self) -> dict:
+            m = self.model
+            tail, count, garbage, tombs = self._read(
+                lambda mm: [U64.unpack_from(mm, o)[0] for o in (TAIL_OFF, COUNT_OFF, GARBAGE_OFF, TOMBS_OFF)])
+            return {'keys': count, 'slots': m.n_slots, 'tombstones': tombs, 'arena_bytes': m.end - m.arena,
+                    'used_bytes': tail - m.arena - garbage, 'garbage_bytes': garbage, 'free_bytes': m.end - tail}
+
+        def bytes_used(self, deep=True, human_readable=False):
+            return self.stats()['used_bytes']
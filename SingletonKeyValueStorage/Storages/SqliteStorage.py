@@ -10,8 +10,12 @@ import json
 
 try:
     from .Storage import SingletonKeyValueStorage,MemoryLimitedDictStorageController,AbstractStorageController,DictStorage
+    from .Storage import MessageQueueController,EventDispatcherController
+    from .AsyncStorage import AsyncExecutorStorageController
 except Exception as e:
     from Storage import SingletonKeyValueStorage,MemoryLimitedDictStorageController,AbstractStorageController,DictStorage
+    from Storage import MessageQueueController,EventDispatcherController
+    from AsyncStorage import AsyncExecutorStorageController
 
 
 def try_if_error(func):
@@ -243,6 +247,11 @@ if sqlite_back:
         def build_pure(sqlite_URL: str = "sqlite.db"):
             return SingletonSqliteStorageController(SingletonSqliteStorage(sqlite_URL))
 
+        @staticmethod
+        def build_async(sqlite_URL: str = "sqlite.db"):
+            # queries already run on the worker thread; the executor only waits for results
+            return AsyncExecutorStorageController(SingletonSqliteStorage.build(sqlite_URL))
+
     class SingletonSqliteStorageController(AbstractStorageController):
         def __init__(self, model: SingletonSqliteStorage):
             self.model: SingletonSqliteStorage = model
@@ -295,12 +304,12 @@ if sqlite_back:
             # rows is already list[str] (single-column SELECT behavior)
             return rows
 
-        def load(self, path: str):
+        def load(self, path: str, page_size: int = None):
             path_obj = Path(path)
 
-            # Non-DB file: delegate to .loads(text) if your base class supports it
+            # Non-DB file: stream it through the base class JSON loader
             if path_obj.suffix != ".db":
-                return self.loads(path_obj.read_text())
+                return super().load(path, page_size)
             else:
                 new_path = path_obj.absolute()
                 current_path = Path(self.model.sqlite_URL).absolute()
@@ -348,3 +357,159 @@ if sqlite_back:
             return (set(self.memory.keys(pattern)) | set(self.sqlite.keys(pattern)))
             
         def is_query_empty(self): return self.sqlite.is_query_empty()
+
+    class SqliteMessageQueueController(MessageQueueController):
+        """Durable message queues in one SQLite table.
+
+        Messages are rows with an autoincrement id, so FIFO order survives restarts and
+        nothing is held in memory. Pops are one `DELETE ... RETURNING` per batch. Leases
+        from reserve() are a lease token plus a `visible_at` wall-clock time on the row,
+        so unacked messages reappear after a crash as well as after the timeout.
+        """
+        TABLE = "MessageQueue"
+        INSERT_CHUNK = 400  # rows per multi-VALUES insert, stays under the bound-parameter limit
+
+        def __init__(self, sqlite_URL: str = "queue.db",
+                     poll_interval: float = 0.05,
+                     dispatcher: Optional[EventDispatcherController] = None):
+            super().__init__(DictStorage(), dispatcher=dispatcher)
+            self.sqlite_URL = sqlite_URL
+            # blocked pops re-check this often, to see other processes' pushes and expired leases
+            self.poll_interval = poll_interval
+            self.db_lock = threading.Lock()
+            self.client = sqlite3.connect(sqlite_URL, check_same_thread=False, isolation_level=None)
+            self.client.execute("PRAGMA journal_mode=WAL")
+            self.client.execute("PRAGMA synchronous=NORMAL")
+            self.client.execute(f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+                                "id INTEGER PRIMARY KEY AUTOINCREMENT, queue TEXT NOT NULL, message TEXT NOT NULL, "
+                                "visible_at REAL NOT NULL DEFAULT 0, lease TEXT)")
+            self.client.execute(f"CREATE INDEX IF NOT EXISTS {self.TABLE}_queue_id ON {self.TABLE} (queue, id)")
+
+        def _sql(self, sql: str, params: tuple = ()) -> List[tuple]:
+            with self.db_lock: return self.client.execute(sql, params).fetchall()
+
+        def _key(self, queue_name: str, row_id: int) -> str:
+            return self._qkey(queue_name, row_id)
+
+        def _sleep(self, queue_name: str, deadline: Optional[float]) -> bool:
+            # wait in short slices; pushes from other processes do not notify this one
+            now = time.monotonic()
+            if deadline is not None and deadline <= now: return False
+            super()._sleep(queue_name, now + self.poll_interval if deadline is None else min(deadline, now + self.poll_interval))
+            return True
+
+        async def pop_async(self, queue_name: str = "default", timeout: Optional[float] = None) -> Optional[dict]:
+            # the base waits for this process's pushes only, so wait in poll_interval slices as _sleep does
+            import asyncio
+            loop = asyncio.get_running_loop()
+            deadline = None if timeout is None else loop.time() + timeout
+            while True:
+                wait = self.poll_interval if deadline is None else min(self.poll_interval, deadline - loop.time())
+                msg = await super().pop_async(queue_name, max(0, wait))
+                if msg is not None or (deadline is not None and loop.time() >= deadline): return msg
+
+        def push(self, message: dict, queue_name: str = "default") -> str:
+            return self.push_many([message], queue_name)[0]
+
+        def push_many(self, messages: List[dict], queue_name: str = "default") -> List[str]:
+            messages = list(messages)
+            if not messages: return []
+            ids = []
+            with self._lock(queue_name):
+                with self.db_lock:
+                    self.client.execute("BEGIN IMMEDIATE")
+                    try:
+                        for i in range(0, len(messages), self.INSERT_CHUNK):
+                            chunk = messages[i:i + self.INSERT_CHUNK]
+                            params = [p for m in chunk for p in (queue_name, json.dumps(m))]
+                            rows = self.client.execute(
+                                f"INSERT INTO {self.TABLE} (queue, message) VALUES "
+                                + ",".join(["(?, ?)"] * len(chunk)) + " RETURNING id", params).fetchall()
+                            ids += sorted(r[0] for r in rows)
+                        self.client.execute("COMMIT")
+                    except BaseException:
+                        self.client.execute("ROLLBACK")
+                        raise
+                self._stats.setdefault(queue_name, [0, 0, 0])[1] += len(messages)
+                self._wake(queue_name, len(messages))
+            keys = [self._key(queue_name, i) for i in ids]
+            self._try_dispatch_event(queue_name, "pushed", keys[0] if len(keys) == 1 else None,
+                                     messages[0] if len(messages) == 1 else messages)
+            return keys
+
+        def _take(self, queue_name: str, n: int):
+            rows = self._sql(f"DELETE FROM {self.TABLE} WHERE id IN (SELECT id FROM {self.TABLE} "
+                             "WHERE queue = ? AND visible_at <= ? ORDER BY id LIMIT ?) RETURNING id, message",
+                             (queue_name, time.time(), n))
+            rows.sort()
+            self._stats.setdefault(queue_name, [0, 0, 0])[2] += len(rows)
+            return [self._key(queue_name, r[0]) for r in rows], [json.loads(r[1]) for r in rows]
+
+        def pop_item(self, queue_name: str = "default", peek: bool = False):
+            with self._lock(queue_name):
+                if peek:
+                    rows = self._sql(f"SELECT id, message FROM {self.TABLE} WHERE queue = ? AND visible_at <= ? "
+                                     "ORDER BY id LIMIT 1", (queue_name, time.time()))
+                    return (self._key(queue_name, rows[0][0]), json.loads(rows[0][1])) if rows else (None, None)
+                keys, msgs = self._take(queue_name, 1)
+                if not keys: return None, None
+            self._try_dispatch_event(queue_name, "popped", keys[0], msgs[0])
+            if self._listens(queue_name, "empty") and self.queue_size(queue_name) == 0:
+                self._try_dispatch_event(queue_name, "empty", None, None)
+            return keys[0], msgs[0]
+
+        def queue_size(self, queue_name: str = "default") -> int:
+            return self._sql(f"SELECT COUNT(*) FROM {self.TABLE} WHERE queue = ? AND visible_at <= ?",
+                             (queue_name, time.time()))[0][0]
+
+        def clear(self, queue_name: str = "default") -> None:
+            with self._lock(queue_name):
+                self._sql(f"DELETE FROM {self.TABLE} WHERE queue = ?", (queue_name,))
+                self._stats.pop(queue_name, None)
+                self._stats_sample.pop(queue_name, None)
+            self._try_dispatch_event(queue_name, "cleared", None, None)
+
+        def list_queues(self) -> List[str]:
+            return sorted(r[0] for r in self._sql(f"SELECT DISTINCT queue FROM {self.TABLE}"))
+
+        def reserve(self, n: int = 1, queue_name: str = "default", visibility_timeout: float = 30.0,
+                    block: bool = False, timeout: Optional[float] = None):
+            deadline = None if timeout is None else time.monotonic() + timeout
+            token = uuid.uuid4().hex
+            with self._lock(queue_name):
+                while True:
+                    now = time.time()
+                    rows = self._sql(f"UPDATE {self.TABLE} SET lease = ?, visible_at = ? WHERE id IN "
+                                     f"(SELECT id FROM {self.TABLE} WHERE queue = ? AND visible_at <= ? "
+                                     "ORDER BY id LIMIT ?) RETURNING id, message",
+                                     (token, now + visibility_timeout, queue_name, now, n))
+                    if rows or not block or not self._sleep(queue_name, deadline): break
+            rows.sort()
+            return [(f"{r[0]}:{token}", json.loads(r[1])) for r in rows]
+
+        def ack(self, lease_id: str) -> bool:
+            row_id, token = lease_id.split(':', 1)
+            return bool(self._sql(f"DELETE FROM {self.TABLE} WHERE id = ? AND lease = ? RETURNING id",
+                                  (int(row_id), token)))
+
+        def nack(self, lease_id: str, requeue: bool = True) -> bool:
+            if not requeue: return self.ack(lease_id)
+            row_id, token = lease_id.split(':', 1)
+            # back to its original position, not the tail
+            rows = self._sql(f"UPDATE {self.TABLE} SET lease = NULL, visible_at = 0 "
+                             "WHERE id = ? AND lease = ? RETURNING queue", (int(row_id), token))
+            if not rows: return False
+            with self._lock(rows[0][0]): self._wake(rows[0][0])
+            return True
+
+        def requeue_expired(self) -> int:
+            return len(self._sql(f"UPDATE {self.TABLE} SET lease = NULL, visible_at = 0 "
+                                 "WHERE lease IS NOT NULL AND visible_at <= ? RETURNING id", (time.time(),)))
+
+        def in_flight(self, queue_name: Optional[str] = None) -> int:
+            sql, params = f"SELECT COUNT(*) FROM {self.TABLE} WHERE visible_at > ?", (time.time(),)
+            if queue_name is not None: sql, params = sql + " AND queue = ?", params + (queue_name,)
+            return self._sql(sql, params)[0][0]
+
+        def close(self) -> None:
+            with self.db_lock: self.client.close()
@@ -4,18 +4,25 @@
 
 # from https://github.com/qinhy/singleton-key-value-storage.git
 import base64
+import gzip
+import heapq
 import sys
-from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, Union
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Tuple, Union
 import uuid
+import weakref
 import fnmatch
+import itertools
 import json
 from pathlib import Path
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 try:
-    from .rjson import SimpleRSAChunkEncryptor, PEMFileReader
+    from .rjson import SimpleRSAChunkEncryptor, PEMFileReader, cached_pkcs8_key
 except Exception as e:
-    from rjson import SimpleRSAChunkEncryptor, PEMFileReader
+    from rjson import SimpleRSAChunkEncryptor, PEMFileReader, cached_pkcs8_key
 
 # HEAVY_LEVEL: Light
 # Reason: Base64-url encodes one string; work grows with input length but is usually cheap.
@@ -39,7 +46,16 @@ def is_b64url(s: str) -> bool:
         return b64url_encode(b64url_decode(s)) == s
     except Exception:
         return False
-        
+
+# HEAVY_LEVEL: Light
+# Reason: Scans the glob once for its first wildcard character.
+# Complexity: O(n), n = length of pattern.
+def glob_literal_prefix(pattern: str) -> str:
+    # literal part before the first fnmatch wildcard, usable as a range/prefix query
+    for i, c in enumerate(pattern):
+        if c in '*?[': return pattern[:i]
+    return pattern
+
 # HEAVY_LEVEL: Heavy
 # Reason: Recursively walks the reachable object graph, including dicts, containers, __dict__, and __slots__.
 # Complexity: O(total reachable objects/items); expensive on large or deeply nested data.
@@ -80,6 +96,117 @@ def humanize_bytes(n):
         size /= 1024.0
     return f"{size:.1f} PB"
 
+_per_store_lock = threading.Lock()
+
+# HEAVY_LEVEL: Light
+# Reason: One dictionary lookup, creating the value once per live store object.
+# Complexity: O(1).
+def per_store(registry: dict, store: Any, factory: Callable[[], Any]) -> Tuple[Any, bool]:
+    # -> (value, created); controllers built on the same store share the value, dropped with the store
+    key = id(store)
+    with _per_store_lock:
+        ref, value = registry.get(key, (None, None))
+        if ref is not None and ref() is store: return value, False
+        value = factory()
+        registry[key] = (weakref.ref(store, lambda r: registry.pop(key, None)), value)
+        return value, True
+
+# HEAVY_LEVEL: Light
+# Reason: Opens a file, peeking two bytes to detect gzip when reading.
+# Complexity: O(1).
+def open_dump_file(path: str, mode: str='r', compress: bool=None):
+    # text handle for a dump file; '.gz' paths (or compress=True) are gzip, reads also sniff the magic
+    if 'r' in mode:
+        with open(path, 'rb') as f: compress = f.read(2) == b'\x1f\x8b'
+    elif compress is None:
+        compress = str(path).endswith('.gz')
+    if compress: return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+NUMBER_CONTINUATION = frozenset('0123456789.eE+-')
+
+# HEAVY_LEVEL: Heavy
+# Reason: Incrementally decodes a JSON object from a text stream, one key/value pair at a time.
+# Complexity: O(stream size); memory O(chunk_size + largest single value).
+def iter_json_object(fp, chunk_size: int=1 << 16, initial: str='') -> Iterator[Tuple[str, Any]]:
+    decoder = json.JSONDecoder()
+    buf, pos, eof = initial, 0, False
+
+    def fill(size=chunk_size):
+        nonlocal buf, pos, eof
+        more = fp.read(size)
+        eof = not more
+        buf, pos = buf[pos:] + more, 0
+        return not eof
+
+    def peek():
+        # next non-whitespace character, reading more input as needed
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace(): pos += 1
+            if pos < len(buf): return buf[pos]
+            if not fill(): raise ValueError('Unexpected end of JSON object.')
+
+    def decode():
+        # a number cut by the chunk boundary still decodes ("1." or "1.5e" as 1, "12" of "123"), so read
+        # on while the match ends at the buffer end or runs into a character no complete value is followed by
+        nonlocal pos
+        size = chunk_size
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                if eof or (end < len(buf) and buf[end] not in NUMBER_CONTINUATION):
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof: raise
+            fill(size)
+            size *= 2  # each retry re-parses from pos, so doubling keeps one big value O(its size)
+
+    if peek() != '{': raise ValueError('Expected a JSON object.')
+    pos += 1
+    if peek() == '}': return
+    while True:
+        peek()
+        key = decode()
+        if peek() != ':': raise ValueError('Expected ":" after key.')
+        pos += 1
+        peek()
+        yield key, decode()
+        c = peek()
+        pos += 1
+        if c == '}': return
+        if c != ',': raise ValueError('Expected "," or "}" in object.')
+
+# HEAVY_LEVEL: Medium
+# Reason: Serializes one page of items; 'json' pages join into the same text json.dumps(dict) gives.
+# Complexity: O(page data size).
+def dump_page(items: List[Tuple[str, Any]], format: Literal['json','jsonl']='json') -> str:
+    if format == 'jsonl':
+        return ''.join(json.dumps([k, v]) + '\n' for k, v in items)
+    return ', '.join(f'{json.dumps(k)}: {json.dumps(v)}' for k, v in items)
+
+# HEAVY_LEVEL: Heavy
+# Reason: Streams a JSON object (or JSON-lines) dump file and groups its items into dict pages.
+# Complexity: O(file size); memory O(page size + largest value).
+def iter_dump_pages(path: str, page_size: int=1000) -> Iterator[Dict[str, Any]]:
+    with open_dump_file(path, 'r') as f:
+        head = f.read(1)
+        while head.isspace(): head = f.read(1)
+        if head == '[':
+            # JSON lines, one [key, value] per line
+            first = head + f.readline()
+            items = (json.loads(line) for line in itertools.chain([first], f) if line.strip())
+        else:
+            items = iter_json_object(f, initial=head)
+        page = {}
+        for k, v in items:
+            page[k] = v
+            if len(page) >= page_size:
+                yield page
+                page = {}
+        if page: yield page
+
 class AbstractStorage:
     _uuid = uuid.uuid4()
     _store = None
@@ -135,6 +262,13 @@ class DictStorage(AbstractStorage):
     # Reason: Factory method creating a singleton-backed DictStorage controller.
     # Complexity: O(1).
     def build(): return DictStorageController(DictStorage().get_singleton())
+
+    @staticmethod
+    # HEAVY_LEVEL: Light
+    # Reason: Factory method creating a thread-safe, lock-striped controller.
+    # Complexity: O(shards).
+    def build_sharded(shards: int = 16, max_memory_mb: float = 1024.0, **kwargs):
+        return ShardedDictStorageController(DictStorage(), shards, max_memory_mb, **kwargs)
     
 class AbstractStorageController:
     # HEAVY_LEVEL: Light
@@ -166,41 +300,78 @@ class AbstractStorageController:
     # Complexity: O(1).
     def keys(self, pattern: str='*')->list[str]: print(f'[{self.__class__.__name__}]: not implement')
     # HEAVY_LEVEL: Medium
+    # Reason: Default loops get() per key; backends with a batch read API override it.
+    # Complexity: O(n * backend get cost), n = len(keys).
+    def mget(self, keys: List[str])->List[dict]: return [self.get(k) for k in keys]
+    # HEAVY_LEVEL: Medium
+    # Reason: Default loops set() per item; backends with a batch write API override it.
+    # Complexity: O(n * backend set cost), n = len(items).
+    def mset(self, items: Dict[str, dict]): [self.set(k,v) for k,v in items.items()]
+    # HEAVY_LEVEL: Medium
+    # Reason: Default loops delete() per key; backends with a batch delete API override it.
+    # Complexity: O(n * backend delete cost), n = len(keys).
+    def mdelete(self, keys: List[str]): [self.delete(k) for k in keys]
+    # HEAVY_LEVEL: Medium
     # Reason: Iterates all keys and deletes each one through the backend.
     # Complexity: O(k), k = number of keys; backend delete cost may add more.
     def clean(self): [self.delete(k) for k in self.keys('*')]
     # HEAVY_LEVEL: Heavy
-    # Reason: Reads every key/value and serializes the full store to JSON.
+    # Reason: Reads every key/value via mget() and serializes the full store to JSON.
     # Complexity: O(total stored data size).
-    def dumps(self): return json.dumps({k:self.get(k) for k in self.keys('*')})
+    def dumps(self):
+        keys = self.keys('*')
+        return json.dumps(dict(zip(keys, self.mget(keys))))
     # HEAVY_LEVEL: Heavy
-    # Reason: Parses a JSON string and writes every item to the backend.
-    # Complexity: O(JSON size + number of items * backend set cost).
-    def loads(self, json_string=r'{}'): [ self.set(k,v) for k,v in json.loads(json_string).items()]
+    # Reason: Parses a JSON string and writes every item to the backend via mset().
+    # Complexity: O(JSON size + backend batch set cost).
+    def loads(self, json_string=r'{}'): self.mset(json.loads(json_string))
+    DUMP_PAGE_SIZE = 1000
     # HEAVY_LEVEL: Heavy
-    # Reason: Serializes the full store and writes it to disk.
-    # Complexity: O(total stored data size + file I/O).
-    def dump(self, path: str):return Path(path).write_text(self.dumps())
+    # Reason: Reads every matching value, page by page, via mget().
+    # Complexity: O(total stored data size); memory O(k + page size), k = number of keys.
+    def iter_items(self, pattern: str='*', page_size: int=None):
+        page_size = page_size or self.DUMP_PAGE_SIZE
+        keys = list(self.keys(pattern))
+        for i in range(0, len(keys), page_size):
+            page = keys[i:i + page_size]
+            yield from zip(page, self.mget(page))
     # HEAVY_LEVEL: Heavy
-    # Reason: Reads a file, parses JSON, and writes all entries to the backend.
-    # Complexity: O(file size + number of items * backend set cost).
-    def load(self, path: str):return self.loads(Path(path).read_text())
-
-    # HEAVY_LEVEL: Critical
-    # Reason: Serializes the full store, loads an RSA key, encrypts the JSON, and writes to disk.
-    # Complexity: O(total stored data size + encryption + file I/O).
-    def dump_RSA(self,path,public_pkcs8_key_path):
+    # Reason: Streams every item to disk page by page; 'json' output matches dumps() byte for byte.
+    # Complexity: O(total stored data size + file I/O); memory O(k + page size).
+    def dump(self, path: str, page_size: int=None, format: Literal['json','jsonl']='json', compress: bool=None):
+        page_size = page_size or self.DUMP_PAGE_SIZE
+        keys = list(self.keys('*'))
+        with open_dump_file(path, 'w', compress) as f:
+            if format != 'jsonl': f.write('{')
+            for i in range(0, len(keys), page_size):
+                page = keys[i:i + page_size]
+                if i and format != 'jsonl': f.write(', ')
+                f.write(dump_page(list(zip(page, self.mget(page))), format))
+            if format != 'jsonl': f.write('}')
+    # HEAVY_LEVEL: Heavy
+    # Reason: Streams a JSON object (or JSON-lines) file and writes entries to the backend in mset() pages.
+    # Complexity: O(file size + backend write cost); memory O(page size + largest value).
+    def load(self, path: str, page_size: int=None):
+        for page in iter_dump_pages(path, page_size or self.DUMP_PAGE_SIZE): self.mset(page)
+
+    # HEAVY_LEVEL: Critical (Heavy with hybrid=True)
+    # Reason: Serializes the full store, encrypts the JSON with a cached RSA key, and writes to disk.
+    # Complexity: O(total stored data size + encryption + file I/O); hybrid does one RSA op in total,
+    # workers>1 splits the RSA chunks over that many processes.
+    def dump_RSA(self,path,public_pkcs8_key_path,hybrid=False,workers=None,binary=False):
         encryptor = SimpleRSAChunkEncryptor(
-            PEMFileReader(public_pkcs8_key_path).load_public_pkcs8_key(), None)
+            cached_pkcs8_key(public_pkcs8_key_path), None, hybrid, workers)
+        if binary: return Path(path).write_bytes(encryptor.encrypt_bytes(self.dumps()))
         return Path(path).write_text(encryptor.encrypt_string(self.dumps()))
 
-    # HEAVY_LEVEL: Critical
-    # Reason: Reads encrypted data, loads an RSA key, decrypts, parses JSON, and writes all entries.
-    # Complexity: O(file size + decryption + JSON parse + backend writes).
-    def load_RSA(self,path,private_pkcs8_key_path):
+    # HEAVY_LEVEL: Critical (Heavy for hybrid envelopes)
+    # Reason: Reads encrypted data (text or binary), decrypts with a cached RSA key, parses JSON, and writes all entries.
+    # Complexity: O(file size + decryption + JSON parse + backend writes); hybrid does one RSA op in total,
+    # workers>1 splits the RSA chunks over that many processes.
+    def load_RSA(self,path,private_pkcs8_key_path,workers=None):
         encryptor = SimpleRSAChunkEncryptor(
-            None, PEMFileReader(private_pkcs8_key_path).load_private_pkcs8_key())
-        return self.loads(encryptor.decrypt_string(Path(path).read_text()))
+            None, cached_pkcs8_key(private_pkcs8_key_path, private=True), workers=workers)
+        return self.loads(encryptor.decrypt_bytes(Path(path).read_bytes()))
 
 class DictStorageController(AbstractStorageController):
     # HEAVY_LEVEL: Light
@@ -236,7 +407,7 @@ class MemoryLimitedDictStorageController(DictStorageController):
     # Complexity: O(1), but future set/delete costs are higher due to tracking.
     def __init__(self,model: DictStorage, 
                  max_memory_mb: float = 1024.0, policy: str = 'lru',
-                on_evict: Optional[Callable[[str, dict], None]] = lambda x:x,
+                on_evict: Optional[Callable[[str, dict], None]] = lambda k,v:None,
                 pinned: Optional[set[str]] = None,):
         super().__init__(model)
         self.max_bytes = int(max(0, max_memory_mb) * 1024 * 1024)
@@ -330,9 +501,186 @@ class MemoryLimitedDictStorageController(DictStorageController):
         super().clean()
         self.init_size_manage()
 
+class ShardedDictStorageController(AbstractStorageController):
+    """Thread-safe dict storage split into lock-striped MemoryLimitedDictStorageController shards.
+
+    A key lives in shard hash(key) % shards; each shard has max_memory_mb / shards of budget and
+    its own LRU/FIFO order. Writes take that shard's lock, and the deep size estimate runs before
+    the lock. Reads do not lock: a single dict lookup is atomic. The LRU touch only happens when the
+    shard lock is free, so under contention recency is approximate instead of a point of waiting.
+    on_evict runs after the lock is released. Entries already in model are loaded into the shards;
+    later writes go to the shards only.
+    """
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Creates one memory-limited controller and one lock per shard, then loads model's entries.
+    # Complexity: O(shards), plus O(size of model's entries) when model is not empty.
+    def __init__(self, model: DictStorage, shards: int = 16, max_memory_mb: float = 1024.0,
+                 policy: str = 'lru', on_evict: Optional[Callable[[str, dict], None]] = None,
+                 pinned: Optional[set[str]] = None):
+        super().__init__(model)
+        self.on_evict = on_evict
+        self.pinned = pinned or set()
+        self._evicted: List[List[Tuple[str, dict]]] = [[] for _ in range(shards)]
+        self._shards = [MemoryLimitedDictStorageController(
+                            DictStorage(), max_memory_mb / shards, policy,
+                            on_evict=lambda k, v, out=out: out.append((k, v)), pinned=self.pinned)
+                        for out in self._evicted]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._lru = self._shards[0].policy == 'lru'
+        if model.store: self.mset(dict(model.store))
+
+    # HEAVY_LEVEL: Light
+    # Reason: One hash and one modulo.
+    # Complexity: O(len(key)) on first hash of a str, then O(1).
+    def _index(self, key: str) -> int: return hash(key) % len(self._shards)
+
+    # HEAVY_LEVEL: Light
+    # Reason: Runs user callbacks for entries a write evicted, outside the shard lock.
+    # Complexity: O(evicted entries * callback cost).
+    def _after_write(self, evicted: List[Tuple[str, dict]]) -> None:
+        if self.on_evict:
+            for k, v in evicted: self.on_evict(k, v)
+
+    # HEAVY_LEVEL: Light
+    # Reason: Lock-free dict membership check.
+    # Complexity: Average O(1).
+    def exists(self, key: str) -> bool: return key in self._shards[self._index(key)].store
+
+    # HEAVY_LEVEL: Light
+    # Reason: Lock-free lookup; touches LRU order only if the shard lock is free right now.
+    # Complexity: Average O(1).
+    def get(self, key: str) -> dict:
+        i = self._index(key)
+        shard = self._shards[i]
+        value = shard.store.get(key)
+        if value is not None and self._lru and self._locks[i].acquire(blocking=False):
+            try:
+                shard.move_to_end(key)
+            finally:
+                self._locks[i].release()
+        return value
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Deep size estimate outside the lock, then bookkeeping and possible eviction under it.
+    # Complexity: O(entry object graph size + eviction cost).
+    def set(self, key: str, value: dict):
+        i = self._index(key)
+        shard, evicted = self._shards[i], self._evicted[i]
+        sz = shard._entry_size(key, value)
+        with self._locks[i]:
+            shard.store[key] = value
+            shard._current_bytes += sz - shard._sizes.pop(key, 0)
+            shard._sizes[key] = sz
+            shard.move_to_end(key)
+            shard._maybe_evict()
+            out, evicted[:] = list(evicted), []
+        self._after_write(out)
+
+    # HEAVY_LEVEL: Light
+    # Reason: Removes one key and its size under its shard lock.
+    # Complexity: Average O(1).
+    def delete(self, key: str):
+        i = self._index(key)
+        with self._locks[i]: return self._shards[i].delete(key)
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Copies each shard's key list under its lock, then filters.
+    # Complexity: O(k * p), k = number of keys, p = pattern/key match cost.
+    def keys(self, pattern: str = '*') -> List[str]:
+        res = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock: keys = list(shard.store)
+            res += keys if pattern == '*' else fnmatch.filter(keys, pattern)
+        return res
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Groups keys by shard so each shard lock is taken once.
+    # Complexity: O(n), n = number of keys.
+    def _group(self, keys) -> Dict[int, list]:
+        groups: Dict[int, list] = {}
+        for k in keys: groups.setdefault(self._index(k), []).append(k)
+        return groups
+
+    # HEAVY_LEVEL: Light
+    # Reason: Lock-free lookups without LRU touches.
+    # Complexity: O(n).
+    def mget(self, keys: List[str]) -> List[dict]:
+        shards, n = self._shards, len(self._shards)
+        return [shards[hash(k) % n].store.get(k) for k in keys]
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Sizes every entry outside the locks, then writes each shard's group under one lock.
+    # Complexity: O(total entry object graph size + eviction cost).
+    def mset(self, items: Dict[str, dict]):
+        sizes = {k: self._shards[0]._entry_size(k, v) for k, v in items.items()}
+        out = []
+        for i, keys in self._group(items).items():
+            shard, evicted = self._shards[i], self._evicted[i]
+            with self._locks[i]:
+                for k in keys:
+                    shard.store[k] = items[k]
+                    shard._current_bytes += sizes[k] - shard._sizes.pop(k, 0)
+                    shard._sizes[k] = sizes[k]
+                    shard.move_to_end(k)
+                shard._maybe_evict()
+                out += evicted
+                evicted.clear()
+        self._after_write(out)
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Deletes each shard's group under one lock; missing keys are skipped.
+    # Complexity: O(n).
+    def mdelete(self, keys: List[str]):
+        for i, group in self._group(keys).items():
+            shard = self._shards[i]
+            with self._locks[i]:
+                for k in group:
+                    if k in shard.store: shard.delete(k)
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Empties every shard under its lock.
+    # Complexity: O(k).
+    def clean(self):
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.store.clear()
+                shard.init_size_manage()
+
+    # HEAVY_LEVEL: Light
+    # Reason: Sums the shards' tracked byte counters.
+    # Complexity: O(shards).
+    def bytes_used(self, deep=True, human_readable=False):
+        size = sum(shard._current_bytes for shard in self._shards)
+        return humanize_bytes(size) if human_readable else size
+
 class EventDispatcherController(DictStorageController):
     ROOT_KEY = '_Event'
     _b64_cache_:Dict[str,str] = {'*':'*'}
+    _versions:Dict[int,Tuple[weakref.ref,List[int]]] = {}  # id(store) -> (store ref, [version]), see per_store()
+
+    # HEAVY_LEVEL: Light
+    # Reason: Looks up or creates the version cell shared by every dispatcher on this store.
+    # Complexity: O(1).
+    def __init__(self, model: DictStorage):
+        super().__init__(model)
+        # bumped on every listener change, so callers can cache listener lookups
+        self.version, _ = per_store(self._versions, self.store, lambda: [0])
+
+    # HEAVY_LEVEL: Light
+    # Reason: Stores one callback and bumps the shared version.
+    # Complexity: Average O(1).
+    def set(self, key: str, value: dict):
+        super().set(key, value)
+        self.version[0] += 1
+
+    # HEAVY_LEVEL: Light
+    # Reason: Removes one callback and bumps the shared version.
+    # Complexity: Average O(1).
+    def delete(self, key: str):
+        res = super().delete(key)
+        self.version[0] += 1
+        return res
 
     # HEAVY_LEVEL: Light
     # Reason: Encodes/caches event name and formats one key pattern.
@@ -384,10 +732,415 @@ class EventDispatcherController(DictStorageController):
             cb = self.get(k) or (lambda x:x)
             cb(*args, **kwargs)
 
+    # HEAVY_LEVEL: Light
+    # Reason: Callbacks already ran inline, so there is nothing to wait for.
+    # Complexity: O(1).
+    def flush(self, timeout: Optional[float] = None) -> bool: return True
+
+    # HEAVY_LEVEL: Light
+    # Reason: Inline dispatch never queues events.
+    # Complexity: O(1).
+    def stats(self) -> dict: return {'pending': 0}
+
+class AsyncEventDispatcherController(EventDispatcherController):
+    """Runs callbacks on a thread pool instead of the dispatching thread.
+
+    Events for one listener id run in dispatch order (a slave's set and delete callbacks share its
+    uuid, so they stay ordered); different listeners run in parallel. At most max_pending events wait
+    in total; when full, backpressure 'block' waits, 'drop' discards the new event, and 'coalesce'
+    first replaces a pending event for the same listener and key (args[0]) and otherwise blocks.
+    """
+    BACKPRESSURE = ('block', 'drop', 'coalesce')
+    DRAIN_BATCH = 64  # events one listener may run before yielding its worker
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Creates a thread pool and the bookkeeping for per-listener queues.
+    # Complexity: O(1).
+    def __init__(self, model: DictStorage, workers: int = 4, max_pending: int = 10000,
+                 backpressure: str = 'block', on_error: Optional[Callable[[Exception], None]] = None):
+        super().__init__(model)
+        if backpressure not in self.BACKPRESSURE:
+            raise ValueError(f"backpressure must be one of {self.BACKPRESSURE}")
+        self.max_pending = max_pending
+        self.backpressure = backpressure
+        self.on_error = on_error
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='EventDispatcher')
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._queues: Dict[str, deque] = {}  # listener id -> pending [callback, args, kwargs]
+        self._running: set[str] = set()      # listener ids with a drain task on the pool
+        self._latest: Dict[str, Dict[str, list]] = {}  # listener id -> key -> its pending item (coalesce)
+        self._pending = 0
+        self._metrics = {'dispatched': 0, 'dropped': 0, 'coalesced': 0, 'errors': 0}
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Scans listener keys and enqueues one item per listener; may block when the queue is full.
+    # Complexity: O(k + e), plus waiting time under 'block'.
+    def dispatch_event(self, event_name: str, *args, **kwargs):
+        for k in list(self.keys(self._event_glob(event_name, '*'))):
+            cb = self.get(k)
+            if cb is not None: self._enqueue(k.rsplit(':', 1)[1], cb, args, kwargs)
+
+    # HEAVY_LEVEL: Light
+    # Reason: Appends one item (coalescing it only when the queue is full) under a lock and starts a drain task if none runs.
+    # Complexity: O(1), plus waiting time under 'block'.
+    def _enqueue(self, listener_id: str, cb: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        key = args[0] if self.backpressure == 'coalesce' and args and isinstance(args[0], str) else None
+        with self._lock:
+            if key is None:
+                self._latest.pop(listener_id, None)  # later events must not jump over this one
+            else:
+                item = self._latest.get(listener_id, {}).get(key)
+                if item is not None and self._pending >= self.max_pending:  # only under backpressure
+                    item[:] = [cb, args, kwargs]
+                    self._metrics['coalesced'] += 1
+                    return
+            while self._pending >= self.max_pending:
+                if self.backpressure == 'drop':
+                    self._metrics['dropped'] += 1
+                    return
+                self._not_full.wait()
+            item = [cb, args, kwargs]
+            self._queues.setdefault(listener_id, deque()).append(item)
+            if key is not None: self._latest.setdefault(listener_id, {})[key] = item
+            self._pending += 1
+            start = listener_id not in self._running
+            if start: self._running.add(listener_id)
+        if start: self._pool.submit(self._drain, listener_id)
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Runs one listener's pending callbacks in order on a pool thread.
+    # Complexity: O(min(queue length, DRAIN_BATCH) * callback cost).
+    def _drain(self, listener_id: str) -> None:
+        for _ in range(self.DRAIN_BATCH):
+            with self._lock:
+                q = self._queues.get(listener_id)
+                if not q:
+                    self._queues.pop(listener_id, None)
+                    self._running.discard(listener_id)
+                    return
+                cb, args, kwargs = item = q.popleft()
+                latest = self._latest.get(listener_id)
+                if latest and args and isinstance(args[0], str) and latest.get(args[0]) is item:
+                    del latest[args[0]]
+            try:
+                cb(*args, **kwargs)
+            except Exception as e:
+                with self._lock: self._metrics['errors'] += 1
+                if self.on_error: self.on_error(e)
+            with self._lock:
+                self._pending -= 1
+                self._metrics['dispatched'] += 1
+                self._not_full.notify()
+                if self._pending == 0: self._idle.notify_all()
+        try:
+            self._pool.submit(self._drain, listener_id)  # give other listeners a turn
+        except RuntimeError:  # pool shut down by close(wait=False)
+            with self._lock: self._running.discard(listener_id)
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Waits until every queued callback has run.
+    # Complexity: O(pending callbacks' cost).
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        with self._lock: return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    # HEAVY_LEVEL: Light
+    # Reason: Copies counters and per-listener queue depths.
+    # Complexity: O(number of listeners with pending events).
+    def stats(self) -> dict:
+        with self._lock:
+            return {'pending': self._pending, 'max_pending': self.max_pending, **self._metrics,
+                    'listeners': {lid: len(q) for lid, q in self._queues.items()}}
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Optionally flushes, then shuts the pool down.
+    # Complexity: O(pending callbacks' cost) when wait=True.
+    def close(self, wait: bool = True) -> None:
+        if wait: self.flush()
+        self._pool.shutdown(wait=wait)
+
+class SlaveReplicator:
+    """Buffers a slave's set/delete events and applies them in batches.
+
+    Only the last value per key is kept; a batch goes out through the slave's mdelete()/mset()
+    when max_batch keys are buffered (woken flusher) or every `interval` seconds. With
+    interval=None there is no flusher thread and the writer flushes at max_batch itself.
+    sync() is a barrier: every write recorded before it has reached the slave when it returns.
+    """
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Sets up buffers and may start one flusher thread.
+    # Complexity: O(1).
+    def __init__(self, slave: Any, max_batch: int = 1000, interval: Optional[float] = 0.05,
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        self.slave = slave
+        self.max_batch = max_batch
+        self.interval = interval
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # batches reach the slave one at a time, in order
+        self._wakeup = threading.Condition(self._lock)
+        self._buffer: Dict[str, Optional[dict]] = {}  # key -> last value, None = delete
+        self._seq = 0            # writes recorded
+        self._applied = 0        # writes applied to the slave
+        self._oldest: Optional[float] = None  # perf_counter of the oldest unapplied write
+        self._closed = False
+        self._metrics = {'batches': 0, 'coalesced': 0, 'errors': 0}
+        self._thread = None
+        if interval is not None:
+            self._thread = threading.Thread(target=self._run, name='SlaveReplicator', daemon=True)
+            self._thread.start()
+
+    # HEAVY_LEVEL: Light
+    # Reason: Records one write under a lock; flushes inline only when there is no flusher thread.
+    # Complexity: O(1), plus one batch flush every max_batch keys when interval is None.
+    def _record(self, key: str, value: Optional[dict]) -> None:
+        with self._lock:
+            if key in self._buffer: self._metrics['coalesced'] += 1
+            self._buffer[key] = value
+            self._seq += 1
+            if self._oldest is None: self._oldest = time.perf_counter()
+            full = len(self._buffer) >= self.max_batch
+            if full and self._thread is not None: self._wakeup.notify()
+        if full and self._thread is None: self.flush()
+
+    # HEAVY_LEVEL: Light
+    # Reason: Buffers one set.
+    # Complexity: O(1).
+    def set(self, key: str, value: dict) -> None: self._record(key, value)
+
+    # HEAVY_LEVEL: Light
+    # Reason: Buffers one delete.
+    # Complexity: O(1).
+    def delete(self, key: str) -> None: self._record(key, None)
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Drops buffered writes (the slave is wiped anyway) and cleans the slave.
+    # Complexity: O(slave clean cost).
+    def clean(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                self._buffer.clear()
+                self._applied, self._oldest = self._seq, None
+            self.slave.clean()
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Applies the pending batch before forwarding an event that is not buffered.
+    # Complexity: O(batch cost + forwarded call cost).
+    def forward(self, event_name: str) -> Callable[..., Any]:
+        def call(*args, **kwargs):
+            with self._flush_lock:
+                self._flush_locked()
+                return getattr(self.slave, event_name)(*args, **kwargs)
+        return call
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Swaps out the buffer and writes it to the slave with one mdelete and one mset.
+    # Complexity: O(buffered keys * slave batch cost).
+    def flush(self) -> None:
+        with self._flush_lock: self._flush_locked()
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: flush() body; the caller holds _flush_lock.
+    # Complexity: O(buffered keys * slave batch cost).
+    def _flush_locked(self) -> None:
+        with self._lock:
+            if not self._buffer: return
+            writes, self._buffer = self._buffer, {}
+            seq, self._oldest = self._seq, None
+        deletes = [k for k, v in writes.items() if v is None]
+        if deletes: self._apply('mdelete', 'delete', deletes, lambda k: (k,))
+        sets = {k: v for k, v in writes.items() if v is not None}
+        if sets: self._apply('mset', 'set', sets, lambda k: (k, sets[k]))
+        with self._lock:
+            self._applied = seq
+            self._metrics['batches'] += 1
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Calls the slave's batch method, falling back to per-key calls when it fails.
+    # Complexity: O(batch size * slave write cost).
+    def _apply(self, batch_name: str, one_name: str, batch, args_of: Callable[[str], tuple]) -> None:
+        try:
+            return getattr(self.slave, batch_name)(batch)
+        except Exception:
+            pass
+        for k in batch:
+            try:
+                getattr(self.slave, one_name)(*args_of(k))
+            except KeyError:
+                pass  # deleting a key the slave never had
+            except Exception as e:
+                with self._lock: self._metrics['errors'] += 1
+                if self.on_error: self.on_error(e)
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Flusher loop; sleeps until the interval passes or the buffer fills.
+    # Complexity: O(1) per wakeup, plus one batch flush.
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._closed and len(self._buffer) < self.max_batch:
+                    self._wakeup.wait(self.interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception as e:
+                with self._lock: self._metrics['errors'] += 1
+                if self.on_error: self.on_error(e)
+            if closed: return
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Applies everything recorded so far, waiting for a flush already in progress.
+    # Complexity: O(buffered keys * slave batch cost).
+    def sync(self, timeout: Optional[float] = None) -> bool:
+        if not self._flush_lock.acquire(timeout=-1 if timeout is None else timeout): return False
+        try:
+            self._flush_locked()
+        finally:
+            self._flush_lock.release()
+        return True
+
+    # HEAVY_LEVEL: Light
+    # Reason: Reads counters under a lock.
+    # Complexity: O(1).
+    def lag(self) -> dict:
+        with self._lock:
+            age = 0.0 if self._oldest is None else time.perf_counter() - self._oldest
+            return {'ops': self._seq - self._applied, 'keys': len(self._buffer), 'seconds': age}
+
+    # HEAVY_LEVEL: Light
+    # Reason: Copies counters and the current lag.
+    # Complexity: O(1).
+    def stats(self) -> dict:
+        lag = self.lag()
+        with self._lock:
+            return {'recorded': self._seq, 'applied': self._applied, **self._metrics,
+                    'lag_ops': lag['ops'], 'lag_keys': lag['keys'], 'lag_seconds': lag['seconds']}
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Stops the flusher after a final flush.
+    # Complexity: O(buffered keys * slave batch cost).
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        if self._thread is not None: self._thread.join()
+        self.flush()
+
+class ChangeLogGapError(LookupError):
+    """The requested changes were compacted away or belong to an old epoch; resync from a snapshot."""
+
+class ChangeLog:
+    """Append-only log of backend edits, numbered 1, 2, 3, ... within one epoch.
+
+    Keeps the last max_entries changes, and no more than about max_bytes of JSON text (one loads or
+    restore entry can carry a whole store); older ones are compacted away, and a follower that asks
+    for them gets ChangeLogGapError and must restart from a snapshot. reset() starts a new epoch (e.g.
+    after a backend switch), so positions from the old epoch are rejected the same way.
+    """
+
+    # HEAVY_LEVEL: Light
+    # Reason: Creates an empty deque and a lock.
+    # Complexity: O(1).
+    def __init__(self, max_entries: int = 100000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: deque = deque()  # (seq, op), oldest first
+        self._sizes: deque = deque()    # approximate bytes of each entry, same order
+        self._bytes = 0
+        self.epoch = uuid.uuid4().hex
+        self.last_seq = 0
+
+    # HEAVY_LEVEL: Light
+    # Reason: Measures the JSON text of each non-string argument.
+    # Complexity: O(size of op).
+    @staticmethod
+    def _op_size(op: Tuple[Any, ...]) -> int:
+        return sum(len(a) if isinstance(a, str) else len(json.dumps(a)) for a in op)
+
+    # HEAVY_LEVEL: Light
+    # Reason: Sizes and appends one entry, then drops the oldest while over either bound.
+    # Complexity: O(size of op) plus O(1) amortized per entry dropped.
+    def append(self, op: Tuple[Any, ...]) -> int:
+        size = self._op_size(op)
+        with self._lock:
+            self.last_seq += 1
+            self._entries.append((self.last_seq, op))
+            self._sizes.append(size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._entries.popleft()
+                self._bytes -= self._sizes.popleft()
+            return self.last_seq
+
+    # HEAVY_LEVEL: Light
+    # Reason: Reads the lowest sequence number still retained.
+    # Complexity: O(1).
+    @property
+    def first_seq(self) -> int:
+        with self._lock: return self._entries[0][0] if self._entries else self.last_seq + 1
+
+    # HEAVY_LEVEL: Light
+    # Reason: Reads two fields under the lock.
+    # Complexity: O(1).
+    def position(self) -> Tuple[str, int]:
+        with self._lock: return self.epoch, self.last_seq
+
+    # HEAVY_LEVEL: Light
+    # Reason: Drops all entries and starts a new epoch.
+    # Complexity: O(1) amortized.
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self.epoch = uuid.uuid4().hex
+
+    # HEAVY_LEVEL: Light
+    # Reason: Checks a follower position against the epoch and the compacted prefix.
+    # Complexity: O(1).
+    def _check(self, seq: int, epoch: Optional[str]) -> None:
+        if epoch is not None and epoch != self.epoch:
+            raise ChangeLogGapError(f'epoch {epoch} is gone (now {self.epoch}); resync from a snapshot')
+        first = self._entries[0][0] if self._entries else self.last_seq + 1
+        if not first - 1 <= seq <= self.last_seq:
+            raise ChangeLogGapError(f'seq {seq} is outside the retained log [{first - 1}, {self.last_seq}]; '
+                              'resync from a snapshot')
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Validates the position now, then copies entries out page by page under the lock.
+    # Complexity: O(retained entries) to locate the start, plus O(changes returned).
+    def changes_since(self, seq: int, epoch: Optional[str] = None,
+                      page_size: int = 1000) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        with self._lock: self._check(seq, epoch)
+        def pages():
+            nonlocal seq
+            while True:
+                with self._lock:
+                    self._check(seq, epoch)  # compaction or reset may overtake a slow reader
+                    start = seq - self._entries[0][0] + 1 if self._entries else 0
+                    page = list(itertools.islice(self._entries, start, start + page_size))
+                if not page: return
+                yield from page
+                seq = page[-1][0]
+        return pages()
+
+    # HEAVY_LEVEL: Light
+    # Reason: Reports bounds and size.
+    # Complexity: O(1).
+    def stats(self) -> dict:
+        with self._lock:
+            return {'epoch': self.epoch, 'first_seq': self._entries[0][0] if self._entries else self.last_seq + 1,
+                    'last_seq': self.last_seq, 'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
 class MessageQueueController(MemoryLimitedDictStorageController):
     ROOT_KEY = "_MessageQueue"
     ROOT_KEY_EVENT = "MQE"
     _b64_cache_:Dict[str,str] = {'*':'*'}
+    _registries:Dict[int,Tuple[weakref.ref,Dict[str,List[int]]]] = {}  # id(store) -> (store ref, registry)
 
     # HEAVY_LEVEL: Medium
     # Reason: Initializes memory-limited queue storage and an event dispatcher.
@@ -399,8 +1152,93 @@ class MessageQueueController(MemoryLimitedDictStorageController):
                  on_evict: Optional[Callable[[str, dict], None]] = lambda key, val: None,
                  pinned: Optional[set[str]] = None,
                  dispatcher: Optional[EventDispatcherController] = None):
-        super().__init__(model, max_memory_mb, policy, on_evict, pinned)
+        super().__init__(model, max_memory_mb, policy, self._on_evict_entry, pinned)
+        self._user_on_evict = on_evict
         self.dispatcher = dispatcher or EventDispatcherController(model)
+        # one lock + wakeup per queue; hot paths take the RLock directly (cheaper than Condition.__enter__)
+        self._locks: Dict[str, threading.RLock] = {}
+        self._conds: Dict[str, threading.Condition] = {}
+        self._sleepers: Dict[str, int] = {}  # threads blocked in pop(block=True) per queue
+        self._locks_guard = threading.Lock()
+        self._async_waiters: Dict[str, deque] = {}  # queue_name -> futures of pending pop_async()
+        # at-least-once delivery: lease_id -> (queue_name, deadline, message), expiring via a deadline heap
+        self._leases: Dict[str, Tuple[str, float, Any]] = {}
+        self._lease_heap: List[Tuple[float, str]] = []
+        self._leases_lock = threading.Lock()
+        self._listened: set[str] = set()  # "<event key prefix>" of every event with a listener
+        self._listened_at = -1  # dispatcher version the listened set was built at
+        self._dispatcher_version = self.dispatcher.version
+        # queue registry: queue_name -> [depth, enqueued, dequeued]; rates are sampled by queue_stats()
+        self._stats, created = self._new_registry()
+        self._stats_sample: Dict[str, Tuple[float, int, int]] = {}
+        self._created_at = time.monotonic()
+        self._register_existing(seed=created)
+
+    # HEAVY_LEVEL: Light
+    # Reason: Looks up or creates the registry shared by every keyed controller on this model.
+    # Complexity: O(1).
+    def _new_registry(self) -> Tuple[Dict[str, List[int]], bool]:
+        # the rows live in the model, so controllers on one model must agree on depths and queue names
+        return per_store(self._registries, self.store, dict)
+
+    # HEAVY_LEVEL: Medium
+    # Reason: One scan of the queue keys already in the model, to pin meta rows and seed a new registry.
+    # Complexity: O(k), once per controller.
+    def _register_existing(self, seed: bool = True) -> None:
+        for k in self.keys(f'{self.ROOT_KEY}:*'):
+            parts = k.split(':')
+            if len(parts) < 2 or parts[0] != self.ROOT_KEY: continue
+            if len(parts) == 2: self.pinned.add(k)
+            if not seed: continue
+            stats = self._stats.setdefault(b64url_decode(parts[1]), [0, 0, 0])
+            if len(parts) > 2: stats[0] += 1
+
+    # HEAVY_LEVEL: Light
+    # Reason: Decrements the depth counter of the evicted message's queue, then runs the user callback.
+    # Complexity: O(len(key)) + callback cost.
+    def _on_evict_entry(self, key: str, value: dict) -> None:
+        parts = key.split(':')
+        if len(parts) == 3 and parts[0] == self.ROOT_KEY:
+            stats = self._stats.get(b64url_decode(parts[1]))
+            if stats: stats[0] -= 1
+        self._user_on_evict(key, value)
+
+    # HEAVY_LEVEL: Light
+    # Reason: Dictionary lookup, creating the queue's lock and condition once under a guard lock.
+    # Complexity: O(1).
+    def _lock(self, queue_name: str) -> threading.RLock:
+        lock = self._locks.get(queue_name)
+        if lock is None:
+            with self._locks_guard:
+                if queue_name not in self._locks:
+                    lock = threading.RLock()
+                    self._conds[queue_name] = threading.Condition(lock)
+                    self._locks[queue_name] = lock
+                lock = self._locks[queue_name]
+        return lock
+
+    # HEAVY_LEVEL: Light
+    # Reason: Wakes up to n blocked threads and n pending pop_async() calls, if any are waiting.
+    # Complexity: O(n) amortized; caller holds the queue's lock.
+    def _wake(self, queue_name: str, n: int = 1) -> None:
+        if self._sleepers.get(queue_name): self._conds[queue_name].notify(n)
+        waiters = self._async_waiters.get(queue_name)
+        while waiters and n > 0:
+            fut = waiters.popleft()
+            if fut.done(): continue
+            fut.get_loop().call_soon_threadsafe(lambda f: f.done() or f.set_result(None), fut)
+            n -= 1
+
+    # HEAVY_LEVEL: Light
+    # Reason: Waits once on the queue's condition, counting the sleeper so pushes know to notify.
+    # Complexity: O(1) plus waiting time; caller holds the queue's lock.
+    def _sleep(self, queue_name: str, deadline: Optional[float]) -> bool:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0: return False
+        self._sleepers[queue_name] = self._sleepers.get(queue_name, 0) + 1
+        try: self._conds[queue_name].wait(remaining)
+        finally: self._sleepers[queue_name] -= 1
+        return True
 
     # HEAVY_LEVEL: Light
     # Reason: Base64-url encodes/caches a queue name.
@@ -430,7 +1268,9 @@ class MessageQueueController(MemoryLimitedDictStorageController):
         m = self.get(self._qkey(queue_name))
         if not m:
             m = {'head': 0, 'tail': 0}
+            self.pinned.add(self._qkey(queue_name))  # evicting the meta row would orphan the queue
             self.set(self._qkey(queue_name), m)
+            self._stats.setdefault(queue_name, [0, 0, 0])
         # guard against bad states
         if m['head'] < 0 or m['tail'] < m['head']:
             m = {'head': 0, 'tail': 0}
@@ -449,11 +1289,27 @@ class MessageQueueController(MemoryLimitedDictStorageController):
     def _size_from_meta(self, meta: dict) -> int:
         return max(0, meta['tail'] - meta['head'])
 
+    # HEAVY_LEVEL: Medium
+    # Reason: Rebuilds the listened event set from the dispatcher.
+    # Complexity: O(e), e = number of listeners.
+    def _refresh_listened(self) -> None:
+        self._listened_at = self._dispatcher_version[0]  # read first, so a concurrent change forces another refresh
+        self._listened = {k.rsplit(':', 1)[0] for k in self.dispatcher.keys(f'{self.dispatcher.ROOT_KEY}:*')}
+
+    # HEAVY_LEVEL: Light
+    # Reason: Compares the dispatcher version, then a set lookup on the cached listened events.
+    # Complexity: O(1) when nothing listens; O(len(queue_name)) otherwise; O(e) after a listener change.
+    def _listens(self, queue_name: str, kind: str) -> bool:
+        if self._listened_at != self._dispatcher_version[0]: self._refresh_listened()
+        return bool(self._listened) and \
+            self.dispatcher._event_glob(self._event_name(queue_name, kind), '')[:-1] in self._listened
+
     # HEAVY_LEVEL: Heavy
-    # Reason: Dispatches to arbitrary event callbacks and suppresses their errors.
-    # Complexity: O(listener scan + callback cost).
+    # Reason: Dispatches to arbitrary event callbacks and suppresses their errors; skipped when nothing listens.
+    # Complexity: O(1) with no listener; O(listener scan + callback cost) otherwise.
     def _try_dispatch_event(self, queue_name: str, kind: str,
                             key: Optional[str], message: Optional[dict]) -> None:
+        if not self._listens(queue_name, kind): return
         try:
             self.dispatcher.dispatch_event(
                 self._event_name(queue_name, kind),message=message)
@@ -467,6 +1323,7 @@ class MessageQueueController(MemoryLimitedDictStorageController):
     def add_listener(self, queue_name: str, callback: Callable[..., None],
                      event_kind: Literal["pushed", "popped", "empty", "cleared"] = "pushed",
                      listener_id: Optional[str] = None) -> str:
+        # push_many/pop_many dispatch one "pushed"/"popped" event whose message is the list of messages
         # def on_any_event(message: Any):
         #     # op is one of: "push", "pop", "empty", "clear"
         #     print(f"msg={message}")
@@ -501,15 +1358,61 @@ class MessageQueueController(MemoryLimitedDictStorageController):
     # Reason: Loads/saves metadata, stores the message with deep size tracking, may evict, and dispatches callbacks.
     # Complexity: O(message object graph size + eviction cost + callback cost).
     def push(self, message: dict, queue_name: str = "default") -> str:
-        meta = self._load_meta(queue_name)
-        idx = meta['tail']
-        key = self._qkey(queue_name, idx)
-        self.set(key, message)
-        meta['tail'] = idx + 1
-        self._save_meta(queue_name, meta)
+        with self._lock(queue_name):
+            meta = self._load_meta(queue_name)
+            idx = meta['tail']
+            key = self._qkey(queue_name, idx)
+            self.set(key, message)
+            meta['tail'] = idx + 1
+            self._save_meta(queue_name, meta)
+            stats = self._stats.setdefault(queue_name, [0, 0, 0])
+            stats[0] += 1; stats[1] += 1
+            self._wake(queue_name)
         self._try_dispatch_event(queue_name, "pushed", key, message)
         return key
 
+    # HEAVY_LEVEL: Heavy
+    # Reason: One meta read/write and one batched store write for all messages, then one coalesced event.
+    # Complexity: O(total message size + eviction cost + callback cost).
+    def push_many(self, messages: List[dict], queue_name: str = "default") -> List[str]:
+        messages = list(messages)
+        if not messages: return []
+        with self._lock(queue_name):
+            meta = self._load_meta(queue_name)
+            keys = [self._qkey(queue_name, i) for i in range(meta['tail'], meta['tail'] + len(messages))]
+            self.mset(dict(zip(keys, messages)))
+            meta['tail'] += len(messages)
+            self._save_meta(queue_name, meta)
+            stats = self._stats.setdefault(queue_name, [0, 0, 0])
+            stats[0] += len(messages); stats[1] += len(messages)
+            self._wake(queue_name, len(messages))
+        self._try_dispatch_event(queue_name, "pushed", None, messages)
+        return keys
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: One meta read/write, batched reads/deletes of up to n rows (more when skipping holes).
+    # Complexity: O(n + h + backend batch cost); caller holds the queue's lock.
+    def _take(self, queue_name: str, n: int) -> Tuple[List[str], List[dict]]:
+        meta = self._load_meta(queue_name)
+        keys, msgs = [], []
+        while len(msgs) < n and meta['head'] < meta['tail']:
+            hi = min(meta['tail'], meta['head'] + n - len(msgs))
+            window = [self._qkey(queue_name, i) for i in range(meta['head'], hi)]
+            for k, m in zip(window, self.mget(window)):
+                if m is not None: keys.append(k); msgs.append(m)
+            meta['head'] = hi
+        if keys: self.mdelete(keys)
+        self._save_meta(queue_name, meta)
+        self._count_popped(queue_name, len(msgs))
+        return keys, msgs
+
+    # HEAVY_LEVEL: Light
+    # Reason: Updates two registry counters.
+    # Complexity: O(1).
+    def _count_popped(self, queue_name: str, n: int) -> None:
+        stats = self._stats.get(queue_name)
+        if stats: stats[0] -= n; stats[2] += n
+
     # HEAVY_LEVEL: Medium
     # Reason: Advances across missing/evicted queue entries one by one.
     # Complexity: O(h), h = number of holes skipped.
@@ -525,6 +1428,12 @@ class MessageQueueController(MemoryLimitedDictStorageController):
     # Reason: Loads metadata, skips holes, may delete an item, saves metadata, and dispatches callbacks.
     # Complexity: O(h + delete/save cost + callback cost).
     def pop_item(self, queue_name: str = "default", peek: bool = False) -> Tuple[Optional[str], Optional[dict]]:
+        with self._lock(queue_name): return self._pop_item(queue_name, peek)
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Loads metadata, skips holes, may delete an item, saves metadata, and dispatches callbacks.
+    # Complexity: O(h + delete/save cost + callback cost); caller holds the queue's lock.
+    def _pop_item(self, queue_name: str, peek: bool) -> Tuple[Optional[str], Optional[dict]]:
         meta = self._load_meta(queue_name)
         meta = self._advance_head_past_holes(queue_name, meta)
 
@@ -537,13 +1446,14 @@ class MessageQueueController(MemoryLimitedDictStorageController):
             meta['head'] += 1
             self._save_meta(queue_name, meta)
             meta = self._advance_head_past_holes(queue_name, meta)
-            return (None, None) if meta['head'] >= meta['tail'] else self.pop_item(queue_name, peek)
+            return (None, None) if meta['head'] >= meta['tail'] else self._pop_item(queue_name, peek)
 
         if peek: return key, msg
 
         self.delete(key)
         meta['head'] += 1
         self._save_meta(queue_name, meta)
+        self._count_popped(queue_name, 1)
 
         self._try_dispatch_event(queue_name, "popped", key, msg)
         if self._size_from_meta(meta) == 0:
@@ -551,10 +1461,113 @@ class MessageQueueController(MemoryLimitedDictStorageController):
         return key, msg
 
     # HEAVY_LEVEL: Heavy
-    # Reason: Delegates to pop_item(), which may scan holes and dispatch callbacks.
-    # Complexity: Same as pop_item().
-    def pop(self, queue_name: str = "default") -> Optional[dict]:
-        return self.pop_item(queue_name)[1]
+    # Reason: Delegates to pop_item(); with block=True sleeps on the queue's condition until a push or the timeout.
+    # Complexity: Same as pop_item(), plus waiting time.
+    def pop(self, queue_name: str = "default", block: bool = False, timeout: Optional[float] = None) -> Optional[dict]:
+        if not block: return self.pop_item(queue_name)[1]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock(queue_name):
+            while True:
+                key, msg = self.pop_item(queue_name)
+                if key is not None: return msg
+                if not self._sleep(queue_name, deadline): return None
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Takes up to n messages in one batch (waiting for the first if block=True) and dispatches one event.
+    # Complexity: O(_take cost + callback cost), plus waiting time.
+    def pop_many(self, n: int, queue_name: str = "default",
+                 block: bool = False, timeout: Optional[float] = None) -> List[dict]:
+        if n <= 0: return []
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock(queue_name):
+            while True:
+                keys, msgs = self._take(queue_name, n)
+                if msgs or not block or not self._sleep(queue_name, deadline): break
+            emptied = bool(msgs) and self.queue_size(queue_name) == 0
+        if msgs:
+            self._try_dispatch_event(queue_name, "popped", None, msgs)
+            if emptied: self._try_dispatch_event(queue_name, "empty", None, None)
+        return msgs
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Pops a batch and records an in-flight lease per message; expired leases are requeued first.
+    # Complexity: O(pop_many cost + n log L), L = number of open leases.
+    def reserve(self, n: int = 1, queue_name: str = "default", visibility_timeout: float = 30.0,
+                block: bool = False, timeout: Optional[float] = None) -> List[Tuple[str, dict]]:
+        """At-least-once pop: each message must be ack()-ed within visibility_timeout seconds,
+        otherwise it goes back on the queue (nack() requeues it right away)."""
+        self.requeue_expired()
+        msgs = self.pop_many(n, queue_name, block, timeout)
+        deadline = time.monotonic() + visibility_timeout
+        out = [(uuid.uuid4().hex, m) for m in msgs]
+        with self._leases_lock:
+            for lease_id, m in out:
+                self._leases[lease_id] = (queue_name, deadline, m)
+                heapq.heappush(self._lease_heap, (deadline, lease_id))
+        return out
+
+    # HEAVY_LEVEL: Light
+    # Reason: Drops one lease; its heap entry is discarded lazily.
+    # Complexity: O(1).
+    def ack(self, lease_id: str) -> bool:
+        """False if the lease is unknown or already expired (the message may be redelivered)."""
+        with self._leases_lock: return self._leases.pop(lease_id, None) is not None
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Drops one lease and pushes its message back to the tail of its queue.
+    # Complexity: O(push cost).
+    def nack(self, lease_id: str, requeue: bool = True) -> bool:
+        with self._leases_lock: lease = self._leases.pop(lease_id, None)
+        if lease is None: return False
+        if requeue: self.push(lease[2], lease[0])
+        return True
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Pops expired deadlines off the lease heap and requeues their messages in one batch per queue.
+    # Complexity: O(e log L + push_many cost), e = expired leases.
+    def requeue_expired(self) -> int:
+        if not self._lease_heap or self._lease_heap[0][0] > time.monotonic(): return 0
+        expired: Dict[str, List[dict]] = {}
+        with self._leases_lock:
+            now = time.monotonic()
+            while self._lease_heap and self._lease_heap[0][0] <= now:
+                deadline, lease_id = heapq.heappop(self._lease_heap)
+                lease = self._leases.get(lease_id)
+                if lease is None or lease[1] != deadline: continue  # acked, or stale heap entry
+                del self._leases[lease_id]
+                expired.setdefault(lease[0], []).append(lease[2])
+        for queue_name, msgs in expired.items(): self.push_many(msgs, queue_name)
+        return sum(len(m) for m in expired.values())
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Counts open leases, optionally for one queue.
+    # Complexity: O(L).
+    def in_flight(self, queue_name: Optional[str] = None) -> int:
+        with self._leases_lock:
+            if queue_name is None: return len(self._leases)
+            return sum(1 for q, _, _ in self._leases.values() if q == queue_name)
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Awaits a future resolved by push() from any thread; no thread is parked while waiting.
+    # Complexity: Same as pop_item() per attempt, plus waiting time.
+    async def pop_async(self, queue_name: str = "default", timeout: Optional[float] = None) -> Optional[dict]:
+        import asyncio  # only consumers of the async API pay for the import
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._lock(queue_name):
+                key, msg = self.pop_item(queue_name)
+                if key is not None: return msg
+                fut = loop.create_future()
+                self._async_waiters.setdefault(queue_name, deque()).append(fut)
+            remaining = None if deadline is None else deadline - loop.time()
+            try:
+                if remaining is not None and remaining <= 0: return None
+                await asyncio.wait_for(fut, remaining)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                if not fut.done(): fut.cancel()
 
     # HEAVY_LEVEL: Medium
     # Reason: Delegates to pop_item(peek=True), which may scan holes but does not delete.
@@ -562,47 +1575,220 @@ class MessageQueueController(MemoryLimitedDictStorageController):
     def peek(self, queue_name: str = "default") -> Optional[dict]:
         return self.pop_item(queue_name, True)[1]
 
-    # HEAVY_LEVEL: Medium
-    # Reason: Loads queue metadata, creating/resetting it if missing or invalid.
-    # Complexity: Average O(1), but metadata write can trigger memory tracking.
+    # HEAVY_LEVEL: Light
+    # Reason: Reads the live depth counter (pushes minus pops and evictions).
+    # Complexity: O(1).
     def queue_size(self, queue_name: str = "default") -> int:
-        return self._size_from_meta(self._load_meta(queue_name))
+        stats = self._stats.get(queue_name)
+        return max(0, stats[0]) if stats else 0
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Deletes the rows between the queue's head and tail plus its meta row.
+    # Complexity: O(q), q = tail - head; caller holds the queue's lock.
+    def _delete_keyed(self, queue_name: str) -> None:
+        meta_key = self._qkey(queue_name)
+        meta = self.get(meta_key)
+        if meta:
+            for i in range(meta['head'], meta['tail']):
+                key = self._qkey(queue_name, i)
+                if self.exists(key): self.delete(key)
+            self.delete(meta_key)
+        self.pinned.discard(meta_key)
 
     # HEAVY_LEVEL: Heavy
-    # Reason: Scans queue keys, deletes every queue entry, deletes metadata, and dispatches a callback.
-    # Complexity: O(k + q + callback cost), q = queue entries.
+    # Reason: Deletes every queue entry and the metadata, drops the registry entry, and dispatches a callback.
+    # Complexity: O(q + callback cost), q = queue entries.
     def clear(self, queue_name: str = "default") -> None:
-        for key in list(self.keys(f"{self.ROOT_KEY}:{self._qname(queue_name)}:*")):
-            self.delete(key)
-        self.delete(self._qkey(queue_name))
+        with self._lock(queue_name):
+            self._delete_keyed(queue_name)
+            self._stats.pop(queue_name, None)
+            self._stats_sample.pop(queue_name, None)
         self._try_dispatch_event(queue_name, "cleared", None, None)
 
-    # HEAVY_LEVEL: Medium
-    # Reason: Scans all message queue keys and sorts discovered queue names.
-    # Complexity: O(k + q log q).
+    # HEAVY_LEVEL: Light
+    # Reason: Sorts the registry's queue names.
+    # Complexity: O(n log n), n = number of queues.
     def list_queues(self) -> List[str]:
-        queues: set[str] = set()
-        for k in self.keys(f"{self.ROOT_KEY}:*"):
-            parts = k.split(':')
-            # accept both meta ("ROOT:queue") and entries ("ROOT:queue:index")
-            if len(parts) >= 2 and parts[0] == self.ROOT_KEY:
-                queues.add(self._b64_cache_(parts[1]))                
-        return sorted(queues)
+        return sorted(self._stats)
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Reads depth and counters per queue and derives rates since the previous call.
+    # Complexity: O(n * queue_size cost), n = number of queues reported.
+    def queue_stats(self, queue_name: Optional[str] = None) -> Dict[str, dict]:
+        """{queue: {'depth', 'enqueued', 'dequeued', 'enqueue_rate', 'dequeue_rate'}}; rates are
+        messages/second since the previous queue_stats() call for that queue (or since creation)."""
+        now = time.monotonic()
+        out = {}
+        for name in ([queue_name] if queue_name is not None else self.list_queues()):
+            _, enq, deq = self._stats.get(name, (0, 0, 0))
+            t0, enq0, deq0 = self._stats_sample.get(name, (self._created_at, 0, 0))
+            dt = max(now - t0, 1e-9)
+            out[name] = {'depth': self.queue_size(name), 'enqueued': enq, 'dequeued': deq,
+                         'enqueue_rate': (enq - enq0) / dt, 'dequeue_rate': (deq - deq0) / dt}
+            self._stats_sample[name] = (now, enq, deq)
+        return out
+
+class RingBufferMessageQueueController(MessageQueueController):
+    """Message queues held as per-queue deques; the keyed rows of MessageQueueController are
+    only written by materialize() and read back when a queue is first touched."""
+
+    # HEAVY_LEVEL: Light
+    # Reason: Initializes the parent store/dispatcher and empty per-queue buffers.
+    # Complexity: O(1).
+    def __init__(self,
+                 model: DictStorage,
+                 maxlen: Optional[int] = None,  # per queue; the oldest message is dropped when full
+                 dispatcher: Optional[EventDispatcherController] = None):
+        super().__init__(model, dispatcher=dispatcher)
+        self.maxlen = maxlen
+        self._queues: Dict[str, deque] = {}
+        self._tails: Dict[str, int] = {}  # next index per queue, head = tail - len(queue)
+        self._prefixes: Dict[str, str] = {}  # queue_name -> "_MessageQueue:<b64 name>:"
+
+    # HEAVY_LEVEL: Light
+    # Reason: Creates an empty registry dict.
+    # Complexity: O(1).
+    def _new_registry(self) -> Tuple[Dict[str, List[int]], bool]:
+        return {}, True  # the buffers belong to this controller, and so does their registry
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Creates the buffer for a queue, adopting keyed rows left by materialize() or the keyed controller.
+    # Complexity: O(1) for a new queue; O(q) to adopt q keyed messages.
+    def _buffer(self, queue_name: str) -> deque:
+        q = self._queues.get(queue_name)
+        if q is not None: return q
+        q = self._queues[queue_name] = deque(maxlen=self.maxlen)
+        self._prefixes[queue_name] = self._qkey(queue_name, '')
+        self._stats.setdefault(queue_name, [0, 0, 0])
+        meta = self.get(self._qkey(queue_name))
+        if not meta:
+            self._tails[queue_name] = 0
+            return q
+        keys = [self._qkey(queue_name, i) for i in range(meta['head'], meta['tail'])]
+        q.extend(m for m in self.mget(keys) if m is not None)
+        self._delete_keyed(queue_name)
+        self._tails[queue_name] = meta['tail']
+        return q
+
+    # HEAVY_LEVEL: Light
+    # Reason: Appends to a deque and bumps a counter; dispatch only when someone listens.
+    # Complexity: O(1) amortized, plus callback cost.
+    def push(self, message: dict, queue_name: str = "default") -> str:
+        with self._locks.get(queue_name) or self._lock(queue_name):
+            q = self._queues.get(queue_name)
+            if q is None: q = self._buffer(queue_name)
+            q.append(message)
+            idx = self._tails[queue_name]
+            self._tails[queue_name] = idx + 1
+            self._stats[queue_name][1] += 1
+            key = f'{self._prefixes[queue_name]}{idx}'
+            self._wake(queue_name)
+        if self._listened or self._listened_at != self._dispatcher_version[0]: self._try_dispatch_event(queue_name, "pushed", key, message)
+        return key
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Extends a deque once and dispatches one coalesced event when listened.
+    # Complexity: O(len(messages)), plus callback cost.
+    def push_many(self, messages: List[dict], queue_name: str = "default") -> List[str]:
+        messages = list(messages)
+        if not messages: return []
+        with self._locks.get(queue_name) or self._lock(queue_name):
+            q = self._queues.get(queue_name)
+            if q is None: q = self._buffer(queue_name)
+            q.extend(messages)
+            idx, prefix = self._tails[queue_name], self._prefixes[queue_name]
+            self._tails[queue_name] = idx + len(messages)
+            self._stats[queue_name][1] += len(messages)
+            self._wake(queue_name, len(messages))
+        if self._listened or self._listened_at != self._dispatcher_version[0]: self._try_dispatch_event(queue_name, "pushed", None, messages)
+        return [f'{prefix}{i}' for i in range(idx, idx + len(messages))]
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Pops up to n messages off the left end of a deque.
+    # Complexity: O(n); caller holds the queue's lock.
+    def _take(self, queue_name: str, n: int) -> Tuple[List[str], List[dict]]:
+        q = self._queues.get(queue_name)
+        if q is None: q = self._buffer(queue_name)
+        k = min(n, len(q))
+        head, prefix = self._tails[queue_name] - len(q), self._prefixes[queue_name]
+        self._stats[queue_name][2] += k
+        return [f'{prefix}{i}' for i in range(head, head + k)], [q.popleft() for _ in range(k)]
+
+    # HEAVY_LEVEL: Light
+    # Reason: Pops or peeks the left end of a deque; no holes exist in memory.
+    # Complexity: O(1), plus callback cost.
+    def pop_item(self, queue_name: str = "default", peek: bool = False) -> Tuple[Optional[str], Optional[dict]]:
+        with self._locks.get(queue_name) or self._lock(queue_name):
+            q = self._queues.get(queue_name)
+            if q is None: q = self._buffer(queue_name)
+            if not q: return None, None
+            key = f'{self._prefixes[queue_name]}{self._tails[queue_name] - len(q)}'
+            if peek: return key, q[0]
+            msg = q.popleft()
+            emptied = not q
+            self._stats[queue_name][2] += 1
+        if self._listened or self._listened_at != self._dispatcher_version[0]:
+            self._try_dispatch_event(queue_name, "popped", key, msg)
+            if emptied: self._try_dispatch_event(queue_name, "empty", None, None)
+        return key, msg
+
+    # HEAVY_LEVEL: Light
+    # Reason: Reads a deque length (adopting keyed rows of a registered queue on first use).
+    # Complexity: O(1).
+    def queue_size(self, queue_name: str = "default") -> int:
+        q = self._queues.get(queue_name)
+        if q is None:
+            if queue_name not in self._stats: return 0
+            with self._lock(queue_name): q = self._buffer(queue_name)
+        return len(q)
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Drops the buffer and registry entry, deletes any keyed rows, and dispatches a callback.
+    # Complexity: O(q + callback cost).
+    def clear(self, queue_name: str = "default") -> None:
+        with self._lock(queue_name):
+            self._queues.pop(queue_name, None)
+            self._tails.pop(queue_name, None)
+            self._prefixes.pop(queue_name, None)
+        super().clear(queue_name)
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Writes every buffered message as a keyed row plus a meta row through the memory-tracked store.
+    # Complexity: O(total messages * message size).
+    def materialize(self) -> None:
+        """Write the queues in MessageQueueController's keyed layout (for dumps/snapshots).
+        The buffers stay authoritative; a new controller on the same model adopts the rows."""
+        for queue_name, q in self._queues.items():
+            self._delete_keyed(queue_name)
+            head = self._tails[queue_name] - len(q)
+            self.mset({self._qkey(queue_name, head + i): m for i, m in enumerate(q)})
+            self.pinned.add(self._qkey(queue_name))
+            self.set(self._qkey(queue_name), {'head': head, 'tail': self._tails[queue_name]})
 
 class LocalVersionController:
     TABLENAME = '_Operation'
-    KEY = 'ops'
+    INDEX_TABLENAME = '_OperationIndex'  # checkpointed id segments in the cold store
+    KEY = 'ops'  # legacy index row layout {'ops': [uuid, ...]}, migrated on load
+    HEAD = 'head'
+    TAIL = 'tail'
+    CURRENT = 'current'
+    POS = 'pos'
+    IDS = 'ids'
     FORWARD = 'forward'
     REVERT = 'revert'
+    SEGMENT_SIZE = 1024
 
     # HEAVY_LEVEL: Medium
-    # Reason: May create a memory-limited operation-log backend and initialize the version index.
-    # Complexity: O(1), excluding backend setup side effects.
+    # Reason: May create a memory-limited operation-log backend and rebuilds the position index from it
+    # (or from the cold store's checkpoint rows).
+    # Complexity: O(1) for a new log; O(v) for an existing one, v = number of versions.
     def __init__(
         self,
         client: Optional[AbstractStorageController] = None,
         limit_memory_MB: float = 128.0,
         eviction_policy: str = 'fifo',  # FIFO fits "oldest ops fall off" best; 'lru' also works
+        cold_store: Optional[AbstractStorageController] = None,
+        checkpoint_every: int = 1000,
     ):
         self.limit_memory_MB = float(limit_memory_MB)
         self.client = client
@@ -615,56 +1801,208 @@ class LocalVersionController:
                 on_evict=self._on_evict,
                 pinned={LocalVersionController.TABLENAME},  # never evict the index row
             )
-            
-        table = self.client.get(LocalVersionController.TABLENAME) or {}
-        if LocalVersionController.KEY not in table:
-            self.client.set(LocalVersionController.TABLENAME, {LocalVersionController.KEY: []})
-        self._current_version: Optional[str] = None        
+        # With a cold store, evicted ops spill there instead of being dropped, and checkpoint()
+        # persists the hot tail plus the index so the history survives restarts.
+        self.cold_store = cold_store
+        self.checkpoint_every = checkpoint_every
+        self._in_cold: set = set()          # op ids whose row is in the cold store
+        self._unflushed: set = set()        # op ids only in the hot store
+        self._cold_garbage: List[str] = []  # cold rows to delete at the next checkpoint
+        self._dirty_segments: set = set()
+        self._since_checkpoint = 0
+        # ops live at positions head..tail-1; id <-> position maps make lookups O(1)
+        self._head, self._tail = 0, 0
+        self._id_at: Dict[int, str] = {}
+        self._pos_of: Dict[str, int] = {}
+        self._current_version: Optional[str] = None
+        if cold_store is not None and cold_store.exists(self.TABLENAME):
+            self._load_checkpoint()
+        else:
+            self._load_index()
+
+    # HEAVY_LEVEL: Light
+    # Reason: Formats one op row key.
+    # Complexity: O(1).
+    def _op_key(self, op_id: str) -> str: return f'{self.TABLENAME}:{op_id}'
 
     # HEAVY_LEVEL: Medium
-    # Reason: On operation eviction, copies/searches version list and may rewrite it.
-    # Complexity: O(v), v = number of versions.
+    # Reason: Reads the meta row and every op row once to rebuild the in-memory maps.
+    # Complexity: O(v).
+    def _load_index(self) -> None:
+        table = self.client.get(self.TABLENAME) or {}
+        if self.KEY in table:
+            # old single-list index: give the ops positions in list order
+            for pos, op_id in enumerate(table[self.KEY]):
+                op = self.client.get(self._op_key(op_id))
+                if op is None: continue
+                self.client.set(self._op_key(op_id), {**op, self.POS: pos})
+                self._id_at[pos], self._pos_of[op_id] = op_id, pos
+            self._head, self._tail = 0, len(table[self.KEY])
+        else:
+            keys = list(self.client.keys(f'{self.TABLENAME}:*'))
+            for key, op in zip(keys, self.client.mget(keys)):
+                if op is None or self.POS not in op: continue
+                op_id = key[len(self.TABLENAME) + 1:]
+                self._id_at[op[self.POS]], self._pos_of[op_id] = op_id, op[self.POS]
+            self._head = min(self._id_at, default=table.get(self.HEAD, 0))
+            self._tail = max(table.get(self.TAIL, 0), max(self._id_at, default=-1) + 1)
+        self._save_meta()
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Reads the cold meta row and one id segment per SEGMENT_SIZE versions; op payloads stay on disk.
+    # Complexity: O(v / SEGMENT_SIZE) backend reads + O(v) map inserts.
+    def _load_checkpoint(self) -> None:
+        meta = self.cold_store.get(self.TABLENAME)
+        self._head, self._tail = meta[self.HEAD], meta[self.TAIL]
+        segments = range(self._head // self.SEGMENT_SIZE, (self._tail - 1) // self.SEGMENT_SIZE + 1)
+        rows = self.cold_store.mget([f'{self.INDEX_TABLENAME}:{seg}' for seg in segments])
+        for seg, row in zip(segments, rows):
+            for i, op_id in enumerate((row or {}).get(self.IDS, [])):
+                pos = seg * self.SEGMENT_SIZE + i
+                if op_id is None or not (self._head <= pos < self._tail): continue
+                self._id_at[pos], self._pos_of[op_id] = op_id, pos
+                self._in_cold.add(op_id)
+        current = meta.get(self.CURRENT)
+        self._current_version = current if current in self._pos_of else None
+        self._save_meta()
+
+    # HEAVY_LEVEL: Light
+    # Reason: Writes a two-field meta row.
+    # Complexity: O(1).
+    def _save_meta(self) -> None:
+        self.client.set(self.TABLENAME, {self.HEAD: self._head, self.TAIL: self._tail})
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Copies unflushed hot ops, changed index segments and the meta row to the cold store.
+    # Complexity: O(ops since last checkpoint + changed segments * SEGMENT_SIZE + backend batch cost).
+    def checkpoint(self) -> None:
+        if self.cold_store is None: return
+        ids = list(self._unflushed)
+        keys = [self._op_key(op_id) for op_id in ids]
+        self.cold_store.mset({k: v for k, v in zip(keys, self.client.mget(keys)) if v is not None})
+        self._in_cold.update(ids)
+        self._unflushed.clear()
+        self.cold_store.mset({f'{self.INDEX_TABLENAME}:{seg}': {self.IDS: [
+                                  self._id_at.get(p) for p in range(seg * self.SEGMENT_SIZE, (seg + 1) * self.SEGMENT_SIZE)]}
+                              for seg in self._dirty_segments})
+        self._dirty_segments.clear()
+        garbage = [self._op_key(op_id) for op_id in self._cold_garbage]
+        self.cold_store.mdelete([k for k, v in zip(garbage, self.cold_store.mget(garbage)) if v is not None])
+        self._cold_garbage = []
+        self.cold_store.set(self.TABLENAME, {self.HEAD: self._head, self.TAIL: self._tail,
+                                             self.CURRENT: self._current_version})
+        self._since_checkpoint = 0
+
+    # HEAVY_LEVEL: Light
+    # Reason: Drops one op from the maps and advances head past missing positions.
+    # Complexity: Amortized O(1).
+    def _forget(self, op_id: str) -> None:
+        pos = self._pos_of.pop(op_id, None)
+        if pos is None: return
+        self._id_at.pop(pos, None)
+        self._dirty_segments.add(pos // self.SEGMENT_SIZE)
+        self._unflushed.discard(op_id)
+        if op_id in self._in_cold:
+            self._in_cold.discard(op_id)
+            self._cold_garbage.append(op_id)
+        while self._head < self._tail and self._head not in self._id_at: self._head += 1
+        while self._tail > self._head and (self._tail - 1) not in self._id_at: self._tail -= 1
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Deletes op rows from the hot store (cold rows go at the next checkpoint) and the maps.
+    # Complexity: O(len(op_ids) + backend delete cost).
+    def _delete_ops(self, op_ids: List[str]) -> None:
+        keys = [self._op_key(op_id) for op_id in op_ids]
+        self.client.mdelete([k for k, v in zip(keys, self.client.mget(keys)) if v is not None])  # one read, not one per key
+        for op_id in op_ids: self._forget(op_id)
+
+    # HEAVY_LEVEL: Light
+    # Reason: One hot read, falling back to one cold read for spilled ops.
+    # Complexity: Backend get cost, typically O(1).
+    def _get_op(self, op_id: str) -> Optional[dict]:
+        op = self.client.get(self._op_key(op_id))
+        if op is None and op_id in self._in_cold:
+            op = self.cold_store.get(self._op_key(op_id))
+        return op
+
+    # HEAVY_LEVEL: Medium
+    # Reason: One hot batch read plus one cold batch read for the spilled misses.
+    # Complexity: O(len(op_ids)) + backend batch cost.
+    def _get_ops(self, op_ids: List[str]) -> List[Optional[dict]]:
+        ops = self.client.mget([self._op_key(op_id) for op_id in op_ids])
+        missing = [i for i, (op_id, op) in enumerate(zip(op_ids, ops)) if op is None and op_id in self._in_cold]
+        if missing:
+            for i, op in zip(missing, self.cold_store.mget([self._op_key(op_ids[i]) for i in missing])):
+                ops[i] = op
+        return ops
+
+    # HEAVY_LEVEL: Light
+    # Reason: Updates the in-memory maps for one evicted op row, or spills it to the cold store.
+    # Complexity: Amortized O(1) + one cold write when spilling.
     def _on_evict(self, key: str, value: dict) -> None:
         # We only care about per-op rows like "_Operation:<uuid>"
         prefix = f'{LocalVersionController.TABLENAME}:'
         if not key.startswith(prefix): return
 
         op_id = key[len(prefix):]
-        ops = self.get_versions()
-        if op_id in ops:
-            ops.remove(op_id)
-            self._set_versions(ops)
+        if self.cold_store is not None:
+            if op_id in self._pos_of and op_id not in self._in_cold:
+                self.cold_store.set(key, value)
+                self._in_cold.add(op_id)
+                self._unflushed.discard(op_id)
+            return
+        # meta row is rewritten by the next add/pop, not from inside the backend's set()
+        self._forget(op_id)
 
         # If we evicted the current pointer, move it to the tail (latest) or None
         if self._current_version == op_id:raise ValueError('auto removed current_version')
 
     # HEAVY_LEVEL: Medium
-    # Reason: Reads the version index and copies it to a new list.
+    # Reason: Materializes the ordered version list from the position map.
     # Complexity: O(v), v = number of versions.
     def get_versions(self) -> List[str]:
-        return list(self.client.get(self.TABLENAME).get(self.KEY, []))
+        return [self._id_at[p] for p in range(self._head, self._tail) if p in self._id_at]
 
     # HEAVY_LEVEL: Medium
-    # Reason: Copies and writes the full version list; backend set may do deep size tracking.
-    # Complexity: O(v + backend set cost).
+    # Reason: Rewrites positions for a full ordered list; kept for callers that edit the list directly.
+    # Complexity: O(v + backend set cost per moved op).
     def _set_versions(self, ops: List[str]) -> Any:
         """Persist the ordered list of version UUIDs."""
-        return self.client.set(self.TABLENAME, {self.KEY: list(ops)})
+        self._delete_ops(list(set(self._pos_of) - set(ops)))
+        self._id_at, self._pos_of = {}, {}
+        for pos, op_id in enumerate(ops, start=self._head):
+            op = self._get_op(op_id)
+            if op is None: continue
+            if op.get(self.POS) != pos:
+                self.client.set(self._op_key(op_id), {**op, self.POS: pos})
+                if op_id in self._in_cold: self._unflushed.add(op_id)
+            self._id_at[pos], self._pos_of[op_id] = op_id, pos
+            self._dirty_segments.add(pos // self.SEGMENT_SIZE)
+        self._tail = self._head + len(ops)
+        return self._save_meta()
+
+    # HEAVY_LEVEL: Light
+    # Reason: Dictionary lookup of one version's position.
+    # Complexity: O(1).
+    def version_index(self, version_uuid: Optional[str]) -> Optional[int]:
+        """Index of a version within get_versions()' order (positions may have holes after LRU eviction)."""
+        pos = self._pos_of.get(version_uuid)
+        return None if pos is None else pos - self._head
+
+    # HEAVY_LEVEL: Light
+    # Reason: Reads one op row, from the hot store or the cold store.
+    # Complexity: Backend get cost, typically O(1).
+    def get_operation(self, version_uuid: str) -> Optional[dict]:
+        return self._get_op(version_uuid) if version_uuid in self._pos_of else None
 
     # HEAVY_LEVEL: Medium
-    # Reason: Uses list membership/index lookups over versions and may fetch one op record.
+    # Reason: Builds the version list for the return value; the index lookups themselves are O(1).
     # Complexity: O(v).
     def find_version(self, version_uuid: Optional[str]):
         versions = self.get_versions()
-        current_version_idx = versions.index(self._current_version) if self._current_version in versions else -1
-        target_version_idx = versions.index(version_uuid) if (version_uuid in versions) else None
-
-        op = None
-        if target_version_idx is not None:
-            op_id = versions[target_version_idx]
-            op = self.client.get(f'{self.TABLENAME}:{op_id}')
-
-        return versions, current_version_idx, target_version_idx, op
+        current_version_idx = versions.index(self._current_version) if self._current_version in self._pos_of else -1
+        target_version_idx = versions.index(version_uuid) if (version_uuid in self._pos_of) else None
+        return versions, current_version_idx, target_version_idx, self.get_operation(version_uuid)
 
     # Prefer the backend’s byte counter if available; otherwise fall back to deep measurement.
     # HEAVY_LEVEL: Light usually; Heavy with deep-counting backends
@@ -673,25 +2011,30 @@ class LocalVersionController:
     def estimate_memory_MB(self) -> float:
         return float(self.client.bytes_used(True,False)) / (1024 * 1024)
 
-    # HEAVY_LEVEL: Heavy
-    # Reason: Stores an operation, may deeply size/evict, rewrites version index, and checks memory.
-    # Complexity: O(operation payload size + v + eviction cost).
+    # HEAVY_LEVEL: Medium
+    # Reason: Stores one op row and a two-field meta row; the redo tail it drops is paid once per op.
+    # Complexity: Amortized O(operation payload size + eviction cost).
     def add_operation(self, operation: Tuple[Any, ...], revert: Optional[Tuple[Any, ...]] = None, verbose=False):
         opuuid = str(uuid.uuid4())
 
-        # Store op payload (may trigger eviction of oldest ops in the backend)
-        self.client.set( f'{self.TABLENAME}:{opuuid}',
-                           {self.FORWARD: operation, self.REVERT: revert},)
-
-        # Update ordered index (append)
-        ops = self.get_versions()
         # If we are in the middle (after a manual revert), drop redo tail
-        if self._current_version is not None and self._current_version in ops:
-            opidx = ops.index(self._current_version)
-            ops = ops[: opidx + 1]
-        ops.append(opuuid)
-        self._set_versions(ops)
+        if self._current_version in self._pos_of:
+            cut = self._pos_of[self._current_version] + 1
+            self._delete_ops([self._id_at[p] for p in range(cut, self._tail) if p in self._id_at])
+            self._tail = cut
+
+        # Store op payload at the tail (may trigger eviction of oldest ops in the backend)
+        pos = self._tail
+        self._id_at[pos], self._pos_of[opuuid] = opuuid, pos
+        self._tail += 1
+        self._unflushed.add(opuuid)
+        self._dirty_segments.add(pos // self.SEGMENT_SIZE)
+        self.client.set(self._op_key(opuuid),
+                        {self.FORWARD: operation, self.REVERT: revert, self.POS: pos})
         self._current_version = opuuid
+        self._save_meta()
+        self._since_checkpoint += 1
+        if self.cold_store is not None and self._since_checkpoint >= self.checkpoint_every: self.checkpoint()
 
         # Optional: warn if we still exceed cap (can happen if only pinned keys remain)
         if self.estimate_memory_MB() > self.limit_memory_MB:
@@ -700,96 +2043,141 @@ class LocalVersionController:
             return res
         return None
 
-    # HEAVY_LEVEL: Heavy
-    # Reason: Pops up to n operation records, deletes them, and rewrites the version index.
-    # Complexity: O(min(n, v) + v + backend delete/set cost).
+    # HEAVY_LEVEL: Medium
+    # Reason: Pops up to n operation records from the ends of the log.
+    # Complexity: O(min(n, v) + backend get/delete cost).
     def pop_operation(self, n: int = 1) -> List[Tuple[str, dict]]:
-        if n <= 0: return []
-
-        ops = self.get_versions()
-        if not ops: return []
-
         popped: List[Tuple[str, dict]] = []
-        for _ in range(min(n, len(ops))):
-            pop_idx = 0 if ops and ops[0] != self._current_version else -1
-            op_id = ops[pop_idx]
-            op_key = f"{self.TABLENAME}:{op_id}"
-            op_record = self.client.get(op_key)
-            popped.append((op_id, op_record))
-
+        for _ in range(max(0, n)):
+            if not self._pos_of: break
+            head_id = self._id_at[self._head]
+            op_id = head_id if head_id != self._current_version else self._id_at[self._tail - 1]
+            popped.append((op_id, self._get_op(op_id)))
             # Remove from index and store
-            ops.pop(pop_idx)
-            self.client.delete(op_key)
-
-        self._set_versions(ops)
+            self._delete_ops([op_id])
+        if not popped: return popped
+        self._save_meta()
 
         # Fix current pointer if it pointed to a removed op (or list is now empty)
-        if self._current_version not in ops:
-            self._current_version = ops[-1] if ops else None
+        if self._current_version not in self._pos_of:
+            self._current_version = self._id_at[self._tail - 1] if self._pos_of else None
 
         return popped
 
-    # HEAVY_LEVEL: Medium
+    # HEAVY_LEVEL: Light
+    # Reason: Finds the neighbouring existing position, skipping holes left by LRU eviction.
+    # Complexity: O(1) amortized; O(holes) worst case.
+    def _neighbour(self, version_uuid: Optional[str], step: int) -> Optional[str]:
+        pos = self._pos_of.get(version_uuid, self._head - 1) + step
+        while self._head <= pos < self._tail:
+            if pos in self._id_at: return self._id_at[pos]
+            pos += step
+        return None
+
+    # HEAVY_LEVEL: Light
     # Reason: Finds next version, reads one op, and calls a user-provided callback.
-    # Complexity: O(v + callback cost).
+    # Complexity: O(1) + backend get cost + callback cost.
     def forward_one_operation(self, forward_callback: Callable[[Tuple[Any, ...]], None]) -> None:
-        versions, current_version_idx, _, _ = self.find_version(self._current_version)
-        next_idx = current_version_idx + 1
-        if next_idx >= len(versions): return
+        next_id = self._neighbour(self._current_version, 1)
+        if next_id is None: return
 
-        op = self.client.get(f'{self.TABLENAME}:{versions[next_idx]}')
+        op = self._get_op(next_id)
         if not op or self.FORWARD not in op: return
 
         forward_callback(op[self.FORWARD])
-        self._current_version = versions[next_idx]
+        self._current_version = next_id
 
-    # HEAVY_LEVEL: Medium
+    # HEAVY_LEVEL: Light
     # Reason: Finds current version, reads revert op, and calls a user-provided callback.
-    # Complexity: O(v + callback cost).
+    # Complexity: O(1) + backend get cost + callback cost.
     def revert_one_operation(self, revert_callback: Callable[[Optional[Tuple[Any, ...]]], None]) -> None:
-        versions, current_version_idx, _, op = self.find_version(self._current_version)
-        if current_version_idx is None or current_version_idx <= 0: return
+        if self._current_version not in self._pos_of: return
+        prev_id = self._neighbour(self._current_version, -1)
+        if prev_id is None: return
+        op = self._get_op(self._current_version)
         if not op or self.REVERT not in op: return
 
         revert_callback(op[self.REVERT])
-        self._current_version = versions[current_version_idx - 1]
+        self._current_version = prev_id
 
     # HEAVY_LEVEL: Heavy
-    # Reason: Walks version-by-version to target, repeatedly calling forward/revert callbacks.
-    # Complexity: O(distance * (version lookup + callback cost)).
-    def to_version(self, version_uuid: str, version_callback: Callable[[Tuple[Any, ...]], None]) -> None:
-        _, current_idx, target_idx, _ = self.find_version(version_uuid)
-        if target_idx is None:
+    # Reason: Reads every op row in the range (one mget) and hands them to a callback; without
+    # batch_callback it walks version-by-version, calling forward/revert callbacks.
+    # Complexity: O(distance + callback cost).
+    def to_version(self, version_uuid: str, version_callback: Callable[[Tuple[Any, ...]], None],
+                   batch_callback: Optional[Callable[[List[Tuple[Any, ...]]], None]] = None) -> None:
+        if version_uuid not in self._pos_of:
             raise ValueError(f'no such version of {version_uuid}')
+        target = self._pos_of[version_uuid]
 
-        if current_idx is None: current_idx = -1
-
-        while current_idx != target_idx:
-            if current_idx < target_idx:
+        if batch_callback is not None:
+            # forward ops after current up to target, or revert ops from current down to just above target
+            current = self._pos_of.get(self._current_version, self._head - 1)
+            if target > current:
+                positions, field = range(current + 1, target + 1), self.FORWARD
+            else:
+                positions, field = range(current, target, -1), self.REVERT
+            ids = [self._id_at[p] for p in positions if p in self._id_at]
+            applied = []
+            for op in self._get_ops(ids):
+                if not op or field not in op: break  # a missing op row blocks the jump, as it does stepwise
+                applied.append(op[field])
+            batch_callback(applied)
+            # forward ends on the last applied op; a revert ends just below the last reverted one
+            stops = [self._current_version] + ids if field == self.FORWARD else ids + [version_uuid]
+            self._current_version = stops[len(applied)]
+            return
+
+        while self._current_version != version_uuid:
+            current = self._pos_of.get(self._current_version, self._head - 1)
+            before = self._current_version
+            if current < target:
                 self.forward_one_operation(version_callback)
-                current_idx += 1
             else:
                 self.revert_one_operation(version_callback)
-                current_idx -= 1
+            if self._current_version == before: break  # blocked, e.g. missing op row
 
 class SingletonKeyValueStorage(AbstractStorageController):
+    # per-queue cap of message_queue; the oldest message is dropped when a queue is full
+    MESSAGE_QUEUE_MAXLEN = 100_000
+
     # HEAVY_LEVEL: Medium
     # Reason: Initializes controllers and switches to the default DictStorage backend.
     # Complexity: O(1), excluding controller setup side effects.
     def __init__(self,version_controll=False,
-                 encryptor:SimpleRSAChunkEncryptor=None)->None:
+                 encryptor:SimpleRSAChunkEncryptor=None,
+                 version_store:AbstractStorageController=None,
+                 async_events:dict=None,
+                 change_log:Union[int,dict]=None)->None:
         self.version_controll = version_controll
         self.encryptor = encryptor
+        # optional on-disk controller the op log spills to and checkpoints into
+        self.version_store = version_store
+        # kwargs for AsyncEventDispatcherController (e.g. {'workers': 4, 'backpressure': 'coalesce'});
+        # None keeps callbacks inline on the writer's thread
+        self.async_events = async_events
+        # number of backend edits kept for changes_since(), or ChangeLog kwargs
+        # (e.g. {'max_entries': 100000, 'max_bytes': 64 << 20}); None disables the change log
+        self._changes = None if change_log is None else (
+            ChangeLog(**change_log) if isinstance(change_log, dict) else ChangeLog(change_log))
         self.conn:AbstractStorageController = None
+        self._replicators:Dict[str,SlaveReplicator] = {}  # slave uuid -> batching replicator
         self.switch_backend(DictStorage.build())
     
     # HEAVY_LEVEL: Medium
     # Reason: Rebuilds event dispatcher, version controller, message queue, and backend reference.
     # Complexity: O(1), but creates several controller objects.
     def switch_backend(self,controller:AbstractStorageController):
-        self._event_dispa = EventDispatcherController(DictStorage())
-        self._verc = LocalVersionController()
-        self.message_queue = MessageQueueController(DictStorage.build_tmp())
+        old = getattr(self,'_event_dispa',None)
+        if isinstance(old,AsyncEventDispatcherController): old.close(wait=False)
+        for r in self._replicators.values(): r.close()  # slaves are registered on the old dispatcher
+        self._replicators = {}
+        opts = getattr(self,'async_events',None)
+        self._event_dispa = EventDispatcherController(DictStorage()) if opts is None \
+                            else AsyncEventDispatcherController(DictStorage(),**opts)
+        self._verc = LocalVersionController(cold_store=getattr(self,'version_store',None))
+        self.message_queue = RingBufferMessageQueueController(DictStorage.build_tmp(), maxlen=self.MESSAGE_QUEUE_MAXLEN)
+        if self._changes is not None and self.conn is not None: self._changes.reset()  # followers resync
         self.conn = controller
         return self
 
@@ -801,32 +2189,80 @@ class SingletonKeyValueStorage(AbstractStorageController):
     # HEAVY_LEVEL: Medium
     # Reason: Delegates to delete_event(), which scans event keys.
     # Complexity: O(k + matched events).
-    def delete_slave(self, slave:object)->bool: self.delete_event(getattr(slave,'uuid',None))
+    def delete_slave(self, slave:object)->bool:
+        replicator = self._replicators.pop(str(getattr(slave,'uuid',None)),None)
+        if replicator: replicator.close()
+        self.delete_event(getattr(slave,'uuid',None))
 
     # HEAVY_LEVEL: Medium
     # Reason: May assign a UUID and register callbacks for each requested event name.
     # Complexity: O(number of event_names).
-    def add_slave(self, slave:object, event_names=['set','delete'])->bool:
+    def add_slave(self, slave:object, event_names=['set','delete'], batch:dict=None)->bool:
+        # batch: kwargs for SlaveReplicator (e.g. {'max_batch': 1000, 'interval': 0.05}); {} uses its defaults.
+        # None keeps one slave write per master write.
         if getattr(slave,'uuid',None) is None:
             try:
                 setattr(slave,'uuid',uuid.uuid4())
             except Exception:
                 return self._print(f'can not set uuid to {slave}. Skip this slave.')
+        replicator = None
+        if batch is not None:
+            replicator = SlaveReplicator(slave,**batch)
+            old = self._replicators.pop(str(slave.uuid),None)
+            if old: old.close()
+            self._replicators[str(slave.uuid)] = replicator
         for m in event_names:
-            if hasattr(slave, m):
+            if not hasattr(slave, m):
+                self._print(f'no func of "{m}" in {slave}. Skip it.')
+            elif replicator is None:
                 self.set_event(m,getattr(slave,m),getattr(slave,'uuid'))
+            elif m in ('set','delete','clean'):
+                self.set_event(m,getattr(replicator,m),getattr(slave,'uuid'))
             else:
-                self._print(f'no func of "{m}" in {slave}. Skip it.')         
+                self.set_event(m,replicator.forward(m),getattr(slave,'uuid'))
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Waits for queued events, then pushes every buffered slave write out.
+    # Complexity: O(pending callbacks' cost + buffered keys * slave batch cost).
+    def sync(self, timeout: float=None)->bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        left = lambda: None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not self.flush_events(left()): return False
+        return all([r.sync(left()) for r in list(self._replicators.values())])
+
+    # HEAVY_LEVEL: Light
+    # Reason: Collects counters and lag from each batching replicator.
+    # Complexity: O(number of batched slaves).
+    def replication_stats(self)->Dict[str,dict]:
+        return {uid: r.stats() for uid, r in self._replicators.items()}
 
     # HEAVY_LEVEL: Heavy for clean/load/loads; Light/Medium for set/delete
     # Reason: Delegates to backend mutation methods; bulk operations can scan or load full storage.
     # Complexity: Depends on selected backend method.
     def _edit_local(self,func_name:str, key:str=None, value:dict=None):
-        if func_name not in ['set','delete','clean','load','loads']:
+        if func_name not in ['set','delete','clean','load','loads','restore']:
             return self._print(f'no func of "{func_name}". return.')
-        func = getattr(self.conn, func_name)
-        args = [i for i in [key,value] if i is not None]
-        return func(*args)
+        if func_name == 'restore':
+            res = self._restore(key, value)
+        else:
+            func = getattr(self.conn, func_name)
+            args = [i for i in [key,value] if i is not None]
+            res = func(*args)
+        if self._changes is not None: self._log_change(func_name, key, value)
+        return res
+
+    # HEAVY_LEVEL: Light for set/delete/clean; Heavy for load
+    # Reason: Appends one op; a file load is re-read page by page so followers get its content, not its path.
+    # Complexity: O(1), or O(file size) for load with memory O(page size).
+    def _log_change(self, func_name:str, key:str=None, value:dict=None):
+        if func_name == 'load':
+            try:
+                for page in iter_dump_pages(key):
+                    self._changes.append(('restore', json.dumps(page), False))
+            except Exception:
+                self._changes.reset()  # content not readable here, followers take a snapshot
+            return
+        self._changes.append(tuple([func_name]+[i for i in [key,value] if i is not None]))
     
     # HEAVY_LEVEL: Heavy when encrypting or dispatching many callbacks
     # Reason: May RSA-encrypt JSON, mutate backend, and dispatch events.
@@ -863,7 +2299,7 @@ class SingletonKeyValueStorage(AbstractStorageController):
                 self._verc.add_operation(args,revert)
 
             elif func in ['clean','load','loads']:
-                revert = ('loads',self.dumps())
+                revert = ('restore',*self._bulk_snapshot(args))
                 self._verc.add_operation(args,revert)
 
         try:
@@ -873,6 +2309,36 @@ class SingletonKeyValueStorage(AbstractStorageController):
             self._print(e)
             return False
     
+    # HEAVY_LEVEL: Heavy for clean; otherwise proportional to the change
+    # Reason: Reads prior raw values of only the keys a bulk op will overwrite or delete.
+    # Complexity: O(changed keys * backend get cost); clean changes every key, load also streams its file once.
+    def _bulk_snapshot(self, args) -> Tuple[str, bool]:
+        # (JSON of prior values, exact); a null prior value means the key did not exist.
+        # Kept as JSON text: far smaller than nested dicts in the op log, and immune to later mutation.
+        func = args[0]
+        try:
+            if func == 'clean':
+                keys = list(self.conn.keys('*'))
+            elif func == 'loads':
+                keys = list(json.loads(args[1]))
+            else:
+                keys = [k for page in iter_dump_pages(args[1]) for k in page]
+            return json.dumps(dict(zip(keys, self.conn.mget(keys)))), False
+        except Exception:
+            # backend-specific files (e.g. a sqlite .db) do not list their keys, keep an exact full snapshot
+            return self.conn.dumps(), True
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Parses one snapshot and writes it back as batched deletes/sets; exact snapshots also scan current keys.
+    # Complexity: O(snapshot size + backend batch cost), plus O(k) when exact.
+    def _restore(self, snapshot: str, exact: bool=False):
+        snapshot: Dict[str, Optional[dict]] = json.loads(snapshot)
+        if exact: self.conn.mdelete([k for k in self.conn.keys('*') if k not in snapshot])
+        # a replayed snapshot may name keys that are already gone; mdelete may reject missing keys
+        deletes = [k for k, v in snapshot.items() if v is None]
+        self.conn.mdelete([k for k, v in zip(deletes, self.conn.mget(deletes)) if v is not None])
+        self.conn.mset({k: v for k, v in snapshot.items() if v is not None})
+
     # HEAVY_LEVEL: Medium
     # Reason: Delegates one revert operation through LocalVersionController and local edit callback.
     # Complexity: O(version lookup + backend edit cost).
@@ -892,10 +2358,55 @@ class SingletonKeyValueStorage(AbstractStorageController):
         return self._verc._current_version
 
     # HEAVY_LEVEL: Heavy
-    # Reason: Moves version state step-by-step until the target version.
-    # Complexity: O(distance * version/edit callback cost).
+    # Reason: Folds the ops between current and target version into one net write set.
+    # Complexity: O(distance + changed keys * backend batch cost).
     def local_to_version(self,opuuid:str):
-        self._verc.to_version(opuuid,lambda revert:self._edit_local(*revert))
+        self._verc.to_version(opuuid,lambda revert:self._edit_local(*revert),self._edit_local_batch)
+
+    # HEAVY_LEVEL: Heavy
+    # Reason: Replays many ops as a last-write-wins map and applies it with one clean/mdelete/mset.
+    # Complexity: O(number of ops + changed keys * backend batch cost); load ops also read their file.
+    def _edit_local_batch(self, ops: List[Tuple[Any, ...]]):
+        cleared, writes = False, {}  # key -> value, None = delete
+
+        def flush():
+            nonlocal cleared, writes
+            if cleared: self.conn.clean()
+            else:
+                # one mget instead of an exists() round trip per key; mdelete may reject missing keys
+                deletes = [k for k, v in writes.items() if v is None]
+                missing = [k for k, v in zip(deletes, self.conn.mget(deletes)) if v is None]
+                for k in missing: del writes[k]  # not logged either, followers never hold them
+                self.conn.mdelete([k for k in deletes if k in writes])
+            self.conn.mset({k: v for k, v in writes.items() if v is not None})
+            if self._changes is not None and (cleared or writes):
+                self._changes.append(('restore', json.dumps(writes), cleared))
+            cleared, writes = False, {}
+
+        for op in ops:
+            func, args = op[0], op[1:]
+            try:
+                if func == 'set':
+                    writes[args[0]] = args[1]
+                elif func == 'delete':
+                    writes[args[0]] = None
+                elif func == 'clean':
+                    cleared, writes = True, {}
+                elif func == 'loads':
+                    writes.update(json.loads(args[0]))
+                elif func == 'load':
+                    # read fully before touching writes, a non-JSON file falls through to a plain replay
+                    writes.update({k: v for page in iter_dump_pages(args[0]) for k, v in page.items()})
+                elif func == 'restore':
+                    if len(args) > 1 and args[1]: cleared, writes = True, {}
+                    writes.update(json.loads(args[0]))
+                else:
+                    raise ValueError(func)
+            except Exception:
+                # ops that cannot be folded run on their own, in order
+                flush()
+                self._edit_local(*op)
+        flush()
 
     # True False(in error)
     # HEAVY_LEVEL: Heavy when version control/encryption/events are enabled; otherwise Medium
@@ -952,12 +2463,21 @@ class SingletonKeyValueStorage(AbstractStorageController):
     # Reason: Iterates all keys, gets every value, decrypts if needed, and serializes to JSON.
     # Complexity: O(total stored data size + possible decryption cost).
     def dumps(self)->str:                  
-        return self._try_load_error(lambda:json.dumps({k:self.get(k) for k in self.keys('*')}))
+        return self._try_load_error(lambda:json.dumps(dict(self._iter_decrypted())))
+
+    # HEAVY_LEVEL: Heavy when decrypting; otherwise Medium
+    # Reason: Pages values out of the backend via mget() and decrypts them one at a time.
+    # Complexity: O(total stored data size + possible decryption cost); memory O(k + page size).
+    def _iter_decrypted(self, pattern: str='*', page_size: int=None):
+        for k, v in self.conn.iter_items(pattern, page_size):
+            if v and self.encryptor and 'rjson' in v:
+                v = self._try_load_error(lambda:json.loads(self.encryptor.decrypt_string(v['rjson'])))
+            yield k, v
     
     # HEAVY_LEVEL: Heavy
-    # Reason: Delegates full-store dump to backend, including serialization and file I/O.
+    # Reason: Delegates full-store dump to backend, which streams items to the file page by page.
     # Complexity: O(total stored data size + file I/O).
-    def dump(self,json_path)->None:           return self._try_load_error(lambda:self.conn.dump(json_path))
+    def dump(self,json_path,**kwargs)->None:  return self._try_load_error(lambda:self.conn.dump(json_path,**kwargs))
 
     # events 
     # HEAVY_LEVEL: Medium
@@ -980,6 +2500,72 @@ class SingletonKeyValueStorage(AbstractStorageController):
     # Reason: Dispatches to arbitrary registered callbacks.
     # Complexity: O(listener scan + callback cost).
     def dispatch_event(self, event_name, *args, **kwargs): return self._event_dispa.dispatch_event(event_name, *args, **kwargs)
+    # HEAVY_LEVEL: Medium
+    # Reason: Waits for queued callbacks when events run on a worker pool.
+    # Complexity: O(pending callbacks' cost).
+    def flush_events(self, timeout: float=None)->bool: return self._event_dispa.flush(timeout)
+    # HEAVY_LEVEL: Light
+    # Reason: Returns dispatcher queue depth and counters.
+    # Complexity: O(listeners with pending events).
+    def event_stats(self)->dict: return self._event_dispa.stats()
+    # change log
+    # HEAVY_LEVEL: Light
+    # Reason: Reads the change log's epoch and last sequence number.
+    # Complexity: O(1).
+    def change_position(self)->Tuple[str,int]: return self._change_log().position()
+    # HEAVY_LEVEL: Medium
+    # Reason: Validates the position, then streams retained changes page by page.
+    # Complexity: O(retained entries + changes returned).
+    def changes_since(self, seq:int, epoch:str=None, page_size:int=1000):
+        return self._change_log().changes_since(seq, epoch, page_size)
+    # HEAVY_LEVEL: Heavy
+    # Reason: Dumps the whole backend.
+    # Complexity: O(total stored data size).
+    def snapshot(self)->Tuple[str,int,str]:
+        # the position is taken first: edits racing the dump are replayed again, which is harmless
+        epoch, seq = self.change_position()
+        return epoch, seq, self.conn.dumps()
+    # HEAVY_LEVEL: Light
+    # Reason: Returns the log or raises when it is disabled.
+    # Complexity: O(1).
+    def _change_log(self)->ChangeLog:
+        if self._changes is None: raise ValueError('change log is disabled, pass change_log=<max entries>')
+        return self._changes
+
+    # HEAVY_LEVEL: Medium
+    # Reason: Replays (seq, op) pairs on the backend; deletes of missing keys are skipped.
+    # Complexity: O(number of changes * backend edit cost).
+    def apply_changes(self, changes)->Optional[int]:
+        seq = None
+        for seq, op in changes: self._apply_change(op)
+        return seq
+
+    # HEAVY_LEVEL: Light/Medium
+    # Reason: One backend edit; replays may repeat a delete, so missing keys are skipped.
+    # Complexity: O(backend edit cost).
+    def _apply_change(self, op:Tuple[Any, ...]):
+        if op[0] == 'delete' and not self.conn.exists(op[1]): return
+        self._edit_local(*op)
+
+    # HEAVY_LEVEL: Heavy when a snapshot is needed; otherwise Medium
+    # Reason: Replays a leader's changes after (epoch, seq), or reloads its snapshot when they are gone.
+    # Complexity: O(changes + backend edit cost), or O(leader's data size) on resync.
+    def catch_up(self, leader:'SingletonKeyValueStorage', epoch:str=None, seq:int=0)->Tuple[str,int]:
+        # returns the new (epoch, seq); store it to resume from there after a restart.
+        # Without an epoch (first contact) start from a snapshot: the backend may hold data older than the log.
+        for resync in ((False, True) if epoch else (True,)):
+            try:
+                if resync:
+                    epoch, seq, snap = leader.snapshot()
+                    self._edit_local('restore', snap, True)
+                epoch = epoch or leader.change_position()[0]
+                for next_seq, op in leader.changes_since(seq, epoch):
+                    self._apply_change(op)
+                    seq = next_seq
+                return epoch, seq
+            except ChangeLogGapError:
+                if resync: raise
+
     # HEAVY_LEVEL: Heavy
     # Reason: Deletes all event entries through dispatcher clean().
     # Complexity: O(number of event keys).
@@ -1,10 +1,39 @@
 # from https://github.com/qinhy/singleton-key-value-storage.git
-from .Storage import SingletonKeyValueStorage
-from .RedisStorage import *
-from .AwsStorage import *
-from .FirestoreStorage import *
-from .SqliteStorage import *
-from .MongoStorage import *
-from .FileSystemStorage import *
-from .CouchStorage import *
-from .TestStorage import *
\ No newline at end of file
+import importlib
+
+from .Storage import (SingletonKeyValueStorage, AbstractStorageController, DictStorage,
+                      DictStorageController, MemoryLimitedDictStorageController, ShardedDictStorageController,
+                      EventDispatcherController, AsyncEventDispatcherController, SlaveReplicator, ChangeLog, ChangeLogGapError,
+                      MessageQueueController, RingBufferMessageQueueController, LocalVersionController)
+
+# Backends are imported on first attribute access, so importing the package
+# does not pull in redis/boto3/pymongo/firestore/requests (or unittest).
+_LAZY_MODULES = {
+    'RedisStorage': ['SingletonRedisStorage', 'SingletonRedisStorageController',
+                     'AsyncSingletonRedisStorageController'],
+    'AwsStorage': ['SingletonDynamoDBStorage', 'SingletonDynamoDBStorageController',
+                   'SingletonS3Storage', 'SingletonS3StorageController'],
+    'FirestoreStorage': ['SingletonFirestoreStorage', 'SingletonFirestoreStorageController'],
+    'SqliteStorage': ['SingletonSqliteStorage', 'SingletonSqliteStorageController',
+                      'SingletonSqlitePythonMixStorageController', 'SqliteMessageQueueController'],
+    'MongoStorage': ['SingletonMongoDBStorage', 'SingletonMongoDBStorageController',
+                     'AsyncSingletonMongoDBStorageController'],
+    'FileSystemStorage': ['SingletonFileSystemStorage', 'SingletonFileSystemStorageController'],
+    'SharedMemoryStorage': ['SingletonSharedMemoryStorage', 'SingletonSharedMemoryStorageController'],
+    'CouchStorage': ['SingletonCouchDBStorage', 'SingletonCouchDBStorageController'],
+    'AsyncStorage': ['AsyncAbstractStorageController', 'AsyncExecutorStorageController',
+                     'AsyncSingletonKeyValueStorage'],
+    'TestStorage': ['Tests'],
+}
+_LAZY_ATTRS = {name: module for module, names in _LAZY_MODULES.items() for name in names}
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value  # cache, later lookups skip __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
@@ -1,9 +1,27 @@
 # from https://github.com/qinhy/singleton-key-value-storage.git
+import os
+import hmac
 import json
 import zlib
 import base64
+import struct
+import hashlib
 from pathlib import Path
 
+# cryptography and the process pool are imported on first use, importing the storage package stays light
+_UNSET = object()
+AESGCM = _UNSET  # cryptography's AESGCM class, or None when the package is not installed
+
+def _aesgcm():
+    global AESGCM
+    if AESGCM is _UNSET:
+        try:
+            from cryptography.hazmat.primitives.ciphers.aead import AESGCM as cls
+        except ImportError:
+            cls = None
+        AESGCM = cls
+    return AESGCM
+
 class PEMFileReader:    
     def __init__(self, file_path):
         self.file_path = file_path
@@ -105,20 +123,199 @@ class PEMFileReader:
         # Parse modulus (n), publicExponent (e), and privateExponent (d)
         n, index = self._parse_asn1_der_integer(rsa_key_data, index)
         e, index = self._parse_asn1_der_integer(rsa_key_data, index)
-        d, _ = self._parse_asn1_der_integer(rsa_key_data, index)
-
-        return d, n
+        d, index = self._parse_asn1_der_integer(rsa_key_data, index)
+
+        # Parse the CRT components: prime1 (p), prime2 (q), exponent1 (dP), exponent2 (dQ), coefficient (qInv)
+        crt = []
+        for _ in range(5):
+            value, index = self._parse_asn1_der_integer(rsa_key_data, index)
+            crt.append(value)
+
+        return RSAPrivateKey(d, n, *crt)
+
+class RSAPrivateKey(tuple):
+    """(d, n) private key that also carries the CRT components when they are known."""
+    def __new__(cls, d, n, p=None, q=None, dP=None, dQ=None, qInv=None):
+        key = super().__new__(cls, (d, n))
+        key.p, key.q, key.dP, key.dQ, key.qInv = p, q, dP, dQ, qInv
+        return key
+
+    def has_crt(self):
+        return None not in (self.p, self.q, self.dP, self.dQ, self.qInv)
+
+    def __getnewargs__(self):
+        return (*self, self.p, self.q, self.dP, self.dQ, self.qInv)
+
+# (absolute path, private) -> ((mtime_ns, size), parsed key)
+_KEY_CACHE = {}
+
+def cached_pkcs8_key(path, private=False):
+    """Parsed PKCS#8 key for a PEM file, cached per process until the file changes."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _KEY_CACHE.get((path, private))
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    reader = PEMFileReader(path)
+    key = reader.load_private_pkcs8_key() if private else reader.load_public_pkcs8_key()
+    _KEY_CACHE[(path, private)] = (stamp, key)
+    return key
+
+def clear_key_cache():
+    _KEY_CACHE.clear()
 
 class SimpleRSAChunkEncryptor:
-    def __init__(self, public_key:tuple[int,int]=None, private_key:tuple[int,int]=None):
+    # Hybrid envelope: "rjson2:<alg>:<flags>:<wrapped key>:<nonce>:<ciphertext>" (base64 fields).
+    # The legacy format is '|'-joined base64 RSA chunks and never contains ':'.
+    HYBRID_PREFIX = 'rjson2'
+    ALG_AESGCM = 'aesgcm'   # AES-256-GCM, needs the cryptography package
+    ALG_SHAKE = 'shake'     # stdlib: SHAKE-256 keystream + HMAC-SHA256 (encrypt-then-MAC)
+    # Binary containers, raw bytes instead of base64 text:
+    #   RJB1 | flags u8 | block length u16 | RSA blocks of that length
+    #   RJB2 | alg u8 | flags u8 | wrapped length u16 | wrapped key | nonce length u8 | nonce | ciphertext
+    MAGIC_RSA = b'RJB1'
+    MAGIC_HYBRID = b'RJB2'
+    FLAG_COMPRESSED = 0x01
+    ALG_IDS = {ALG_AESGCM: 1, ALG_SHAKE: 2}
+
+    # smallest batch handed to a worker process, below this the pickling overhead dominates
+    MIN_BATCH = 64
+
+    def __init__(self, public_key:tuple[int,int]=None, private_key:tuple[int,int]=None, hybrid:bool=False,
+                 workers:int=None):
         self.public_key = public_key
         self.private_key = private_key
+        self.hybrid = hybrid
+        # >1 spreads legacy RSA chunks over a process pool, output is identical to the serial path
+        self.workers = workers
+        self.chunk_size = None
+        # CRT parameters (p, q, dP, dQ, qInv) when the private key carries them
+        self._crt = None
+        if isinstance(private_key, RSAPrivateKey) and private_key.has_crt():
+            self._crt = (private_key.p, private_key.q, private_key.dP, private_key.dQ, private_key.qInv)
         if public_key:
             self.chunk_size = (public_key[1].bit_length() // 8)
             if self.chunk_size <= 0:
                 raise ValueError("The modulus 'n' is too small. Please use a larger key size.")
 
+    def _rsa_encrypt_block(self, chunk: bytes) -> bytes:
+        """RSA-encrypt one chunk (at most chunk_size - 1 bytes) into chunk_size bytes."""
+        e, n = self.public_key
+        # prefix 0x01 so leading zero bytes of the chunk survive the round trip
+        chunk_int = int.from_bytes(b'\x01' + chunk, 'big')
+        return pow(chunk_int, e, n).to_bytes(self.chunk_size, 'big')
+
+    def _rsa_decrypt_block(self, block: bytes) -> bytes:
+        """Invert _rsa_encrypt_block."""
+        c = int.from_bytes(block, 'big')
+        if self._crt:
+            # two half-size exponentiations recombined with Garner's formula
+            p, q, dP, dQ, qInv = self._crt
+            m1, m2 = pow(c % p, dP, p), pow(c % q, dQ, q)
+            chunk_int = m2 + q * ((qInv * (m1 - m2)) % p)
+        else:
+            d, n = self.private_key
+            chunk_int = pow(c, d, n)
+        if chunk_int == 0: return b''  # empty input encrypts to an empty chunk
+        length = (chunk_int.bit_length() - 1) // 8
+        return (chunk_int ^ (1 << (8 * length))).to_bytes(length, 'big')
+
+    def _map_batches(self, func, items: list) -> list:
+        """Apply func to batches of items, in worker processes when self.workers > 1; keeps order."""
+        workers = self.workers or 1
+        batch = max(self.MIN_BATCH, -(-len(items) // (workers * 4)))
+        batches = [items[i:i + batch] for i in range(0, len(items), batch)]
+        if workers <= 1 or len(batches) <= 1:
+            return [func(self, b) for b in batches]
+        # memoryview slices cannot be pickled, copy them only when they leave the process
+        batches = [[bytes(i) if isinstance(i, memoryview) else i for i in b] for b in batches]
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+            return list(pool.map(func, [self] * len(batches), batches))
+
+    def _encrypt_batch(self, chunks: list) -> list:
+        return [base64.b64encode(self._rsa_encrypt_block(chunk)).decode('utf-8') for chunk in chunks]
+
+    def _decrypt_batch(self, chunks: list) -> bytes:
+        return b''.join(self._rsa_decrypt_block(base64.b64decode(chunk)) for chunk in chunks)
+
+    def _encrypt_raw_batch(self, chunks: list) -> bytes:
+        return b''.join(self._rsa_encrypt_block(chunk) for chunk in chunks)
+
+    def _decrypt_raw_batch(self, blocks: list) -> bytes:
+        return b''.join(self._rsa_decrypt_block(block) for block in blocks)
+
+    @staticmethod
+    def _shake_xor(key: bytes, nonce: bytes, data: bytes) -> bytes:
+        stream = hashlib.shake_256(b'rjson2-enc' + key + nonce).digest(len(data))
+        return (int.from_bytes(data, 'big') ^ int.from_bytes(stream, 'big')).to_bytes(len(data), 'big')
+
+    @staticmethod
+    def _shake_tag(key: bytes, header: bytes, nonce: bytes, ciphertext: bytes) -> bytes:
+        mac_key = hashlib.sha256(b'rjson2-mac' + key).digest()
+        return hmac.digest(mac_key, header + nonce + ciphertext, 'sha256')
+
+    def _seal(self, alg: str, key: bytes, header: bytes, data: bytes) -> tuple[bytes, bytes]:
+        """Symmetrically encrypt data, authenticating header as associated data."""
+        if alg == self.ALG_AESGCM:
+            nonce = os.urandom(12)
+            return nonce, _aesgcm()(key).encrypt(nonce, data, header)
+        nonce = os.urandom(16)
+        ciphertext = self._shake_xor(key, nonce, data)
+        return nonce, ciphertext + self._shake_tag(key, header, nonce, ciphertext)
+
+    def _open(self, alg: str, key: bytes, header: bytes, nonce: bytes, ciphertext: bytes) -> bytes:
+        if alg == self.ALG_AESGCM:
+            if _aesgcm() is None:
+                raise ValueError("The cryptography package is required to decrypt AES-GCM envelopes.")
+            try:
+                return _aesgcm()(key).decrypt(nonce, ciphertext, header)
+            except Exception as e:
+                raise ValueError("Authentication failed.") from e
+        if alg == self.ALG_SHAKE:
+            ciphertext, tag = ciphertext[:-32], ciphertext[-32:]
+            if not hmac.compare_digest(tag, self._shake_tag(key, header, nonce, ciphertext)):
+                raise ValueError("Authentication failed.")
+            return self._shake_xor(key, nonce, ciphertext)
+        raise ValueError(f"Unknown envelope algorithm {alg!r}.")
+
+    def encrypt_hybrid(self, plaintext: str, compress: bool=True) -> str:
+        """Wrap a random 256-bit key with RSA once and encrypt the payload symmetrically."""
+        if not self.chunk_size:
+            raise ValueError("Public key required for encryption.")
+        data = plaintext.encode('utf-8')
+        flags = 'z' if compress else '-'
+        if compress: data = zlib.compress(data)
+
+        key = os.urandom(32)
+        wrapped = base64.b64encode(self._rsa_encrypt_block(key)).decode('ascii')
+        alg = self.ALG_AESGCM if _aesgcm() is not None else self.ALG_SHAKE
+        # everything before the nonce is authenticated as associated data
+        header = f'{self.HYBRID_PREFIX}:{alg}:{flags}:{wrapped}'.encode('ascii')
+        nonce, ciphertext = self._seal(alg, key, header, data)
+        return ':'.join([header.decode('ascii'),
+                         base64.b64encode(nonce).decode('ascii'),
+                         base64.b64encode(ciphertext).decode('ascii')])
+
+    def decrypt_hybrid(self, encrypted_data: str) -> str:
+        if not self.private_key:
+            raise ValueError("Private key required for decryption.")
+        try:
+            prefix, alg, flags, wrapped, nonce, ciphertext = encrypted_data.split(':')
+        except ValueError as e:
+            raise ValueError("Malformed hybrid envelope.") from e
+        if prefix != self.HYBRID_PREFIX:
+            raise ValueError(f"Unknown envelope version {prefix!r}.")
+        header = ':'.join([prefix, alg, flags, wrapped]).encode('ascii')
+        key = self._rsa_decrypt_block(base64.b64decode(wrapped))
+        data = self._open(alg, key, header, base64.b64decode(nonce), base64.b64decode(ciphertext))
+        if 'z' in flags: data = zlib.decompress(data)
+        return data.decode('utf-8')
+
     def encrypt_string(self, plaintext: str, compress: bool=True) -> str:
+        if self.hybrid:
+            return self.encrypt_hybrid(plaintext, compress)
         if not self.chunk_size:
             raise ValueError("Public key required for encryption.")
         
@@ -131,45 +328,21 @@ class SimpleRSAChunkEncryptor:
         # Step 2: Split the data into chunks
         chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
 
-        e, n = self.public_key
-        
-        # Step 3: Encrypt each chunk, step by step
-        encrypted_chunks = []
-        for chunk in chunks:
-            # a. Convert chunk to hex
-            chunk_hex = chunk.hex()
-
-            # b. Convert hex string to BigInt, ensuring it starts without 0
-            chunk_int = int('0x1' + chunk_hex, 16)
-
-            # c. Encrypt the BigInt using the public key
-            encrypted_int = pow(chunk_int, e, n)
-
-            # d. Convert the encrypted BigInt to a padded hex string
-            encrypted_hex = encrypted_int.to_bytes((self.chunk_size*2) *4//8, 'big').hex()
-
-            # e. Encode the hex string to Base64
-            encrypted_base64 = base64.b64encode(bytes.fromhex(encrypted_hex)).decode('utf-8')
-
-            # Add the final encrypted Base64 string to the list
-            encrypted_chunks.append(encrypted_base64)
+        # Step 3: Encrypt each chunk and encode it to Base64
+        encrypted_chunks = [c for batch in self._map_batches(SimpleRSAChunkEncryptor._encrypt_batch, chunks)
+                            for c in batch]
 
         # Step 4: Join encrypted chunks with a separator
         return '|'.join(encrypted_chunks)
 
     def decrypt_string(self, encrypted_data: str) -> str:
+        if encrypted_data.startswith(self.HYBRID_PREFIX + ':'):
+            return self.decrypt_hybrid(encrypted_data)
         if not self.private_key:
             raise ValueError("Private key required for decryption.")
 
-        d, n = self.private_key
-
         # Step 1: Decode and decrypt each chunk
-        decrypted_chunks = [
-            bytes.fromhex(
-                hex(pow(int.from_bytes(base64.b64decode(chunk), 'big'), d, n))[3:]  # Remove '0x1' prefix
-            )
-            for chunk in encrypted_data.split('|')
-        ]
+        decrypted_chunks = self._map_batches(SimpleRSAChunkEncryptor._decrypt_batch, encrypted_data.split('|'))
 
         # Step 2: Concatenate decrypted chunks
         data = b''.join(decrypted_chunks)
@@ -183,23 +356,77 @@ class SimpleRSAChunkEncryptor:
             except Exception as e:
                 raise ValueError("Failed to decode data after all attempts.") from e
 
-def dump_rJSONs(data_dict,public_pkcs8_key_path):
+    def encrypt_bytes(self, plaintext: str, compress: bool=True) -> bytes:
+        """Like encrypt_string, but returns the binary container."""
+        if not self.chunk_size:
+            raise ValueError("Public key required for encryption.")
+        data = plaintext.encode('utf-8')
+        flags = self.FLAG_COMPRESSED if compress else 0
+        if compress: data = zlib.compress(data)
+
+        if self.hybrid:
+            key = os.urandom(32)
+            wrapped = self._rsa_encrypt_block(key)
+            alg = self.ALG_AESGCM if _aesgcm() is not None else self.ALG_SHAKE
+            header = self.MAGIC_HYBRID + struct.pack('>BBH', self.ALG_IDS[alg], flags, len(wrapped)) + wrapped
+            nonce, ciphertext = self._seal(alg, key, header, data)
+            return b''.join([header, struct.pack('>B', len(nonce)), nonce, ciphertext])
+
+        chunk_size = self.chunk_size - 1
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+        header = self.MAGIC_RSA + struct.pack('>BH', flags, self.chunk_size)
+        return header + b''.join(self._map_batches(SimpleRSAChunkEncryptor._encrypt_raw_batch, chunks))
+
+    def decrypt_bytes(self, encrypted_data: bytes) -> str:
+        """Decrypt a binary container; anything else is treated as the base64 text form."""
+        view = memoryview(encrypted_data)
+        magic = bytes(view[:4])
+        if magic not in (self.MAGIC_RSA, self.MAGIC_HYBRID):
+            return self.decrypt_string(bytes(view).decode('ascii'))
+        if not self.private_key:
+            raise ValueError("Private key required for decryption.")
+        try:
+            if magic == self.MAGIC_HYBRID:
+                alg_id, flags, wrapped_len = struct.unpack_from('>BBH', view, 4)
+                header_end = 8 + wrapped_len
+                nonce_len, = struct.unpack_from('>B', view, header_end)
+                nonce_end = header_end + 1 + nonce_len
+                alg = {v: k for k, v in self.ALG_IDS.items()}.get(alg_id)
+                key = self._rsa_decrypt_block(view[8:header_end])
+                data = self._open(alg, key, bytes(view[:header_end]),
+                                  bytes(view[header_end + 1:nonce_end]), bytes(view[nonce_end:]))
+            else:
+                flags, block_len = struct.unpack_from('>BH', view, 4)
+                body = view[7:]
+                if block_len == 0 or len(body) % block_len:
+                    raise ValueError("Truncated RSA block container.")
+                blocks = [body[i:i + block_len] for i in range(0, len(body), block_len)]
+                data = b''.join(self._map_batches(SimpleRSAChunkEncryptor._decrypt_raw_batch, blocks))
+        except struct.error as e:
+            raise ValueError("Malformed binary container.") from e
+        if flags & self.FLAG_COMPRESSED: data = zlib.decompress(data)
+        return data.decode('utf-8')
+
+def dump_rJSONs(data_dict,public_pkcs8_key_path,hybrid=False,workers=None,binary=False):
     encryptor = SimpleRSAChunkEncryptor(
-        public_key=PEMFileReader(
-            public_pkcs8_key_path).load_public_pkcs8_key())
+        public_key=cached_pkcs8_key(public_pkcs8_key_path), hybrid=hybrid, workers=workers)
+    if binary: return encryptor.encrypt_bytes(json.dumps(data_dict))
     return encryptor.encrypt_string(json.dumps(data_dict))
 
-def load_rJSONs(encrypted_data,private_pkcs8_key_path):
+def load_rJSONs(encrypted_data,private_pkcs8_key_path,workers=None):
     encryptor = SimpleRSAChunkEncryptor(
-        private_key=PEMFileReader(
-            private_pkcs8_key_path).load_private_pkcs8_key())
+        private_key=cached_pkcs8_key(private_pkcs8_key_path, private=True), workers=workers)
+    if isinstance(encrypted_data, (bytes, bytearray, memoryview)):
+        return json.loads(encryptor.decrypt_bytes(encrypted_data))
     return json.loads(encryptor.decrypt_string(encrypted_data))
 
-def dump_rJSON(data_dict,path,public_pkcs8_key_path):
-    return Path(path).write_text(dump_rJSONs(data_dict,public_pkcs8_key_path))
+def dump_rJSON(data_dict,path,public_pkcs8_key_path,hybrid=False,workers=None,binary=False):
+    data = dump_rJSONs(data_dict,public_pkcs8_key_path,hybrid,workers,binary)
+    return Path(path).write_bytes(data) if binary else Path(path).write_text(data)
 
-def load_rJSON(path,private_pkcs8_key_path):
-    return load_rJSONs(Path(path).read_text(),private_pkcs8_key_path)
+def load_rJSON(path,private_pkcs8_key_path,workers=None):
+    # read_bytes handles both forms: decrypt_bytes falls back to the base64 text
+    return load_rJSONs(Path(path).read_bytes(),private_pkcs8_key_path,workers)
 
 # Example Usage
 def ex1():
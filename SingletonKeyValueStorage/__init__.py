@@ -1,3 +1,24 @@
 # from https://github.com/qinhy/singleton-key-value-storage.git
-from .Storages import SingletonKeyValueStorage,Tests
-from .BasicModel import BasicModel,Model4Basic,Controller4Basic
\ No newline at end of file
+import importlib
+
+from .Storages import SingletonKeyValueStorage
+
+# loaded on first use, BasicModel pulls in pydantic and Tests pulls in unittest
+_LAZY_ATTRS = {
+    'AsyncSingletonKeyValueStorage': '.Storages',
+    'Tests': '.Storages',
+    'BasicModel': '.BasicModel',
+    'Model4Basic': '.BasicModel',
+    'Controller4Basic': '.BasicModel',
+}
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))